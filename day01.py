@@ -1,4 +1,27 @@
-from typing import Iterable
+import bz2
+import gzip
+import lzma
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+from typing import Any, BinaryIO, Iterable, Iterator, List
+
+# Masses loaded into each array by the vectorized path.
+CHUNK_SIZE: int = 1 << 20
+# Bytes read at a time by the streaming reader.
+BLOCK_SIZE: int = 1 << 22
+INT64_MIN: int = -1 << 63
+INT64_MAX: int = (1 << 63) - 1
+LONE_SIGN = re.compile(rb'[-+]\s')
+
+# (magic bytes, function that opens a file object to decompress it)
+COMPRESSED: List = [
+    (b'\x1f\x8b', gzip.open),
+    (b'BZh', bz2.open),
+    (b'\xfd7zXZ\x00', lzma.open),
+]
 
 
 def fuel_required(mass: int, include_fuel_mass: bool = False) -> int:
@@ -11,13 +34,158 @@ def fuel_required(mass: int, include_fuel_mass: bool = False) -> int:
         return fuel_for_mass
 
 
-def total_fuel(masses: Iterable[int], include_fuel_mass: bool = False) -> int:
+def total_fuel(
+        masses: Iterable[int],
+        include_fuel_mass: bool = False,
+        vectorized: bool = False,
+        chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Add up the fuel required for every mass. If vectorized, load the masses
+    into NumPy int64 arrays of chunk_size at a time and compute the fuel
+    for each chunk with array operations; the total is the same.
+    """
+    if vectorized:
+        return sum(chunk_fuel(chunk, include_fuel_mass)
+                   for chunk in chunks(masses, chunk_size))
     return sum(fuel_required(mass, include_fuel_mass) for mass in masses)
 
 
+def chunks(masses: Iterable[int], chunk_size: int) -> Iterator[List[int]]:
+    masses = iter(masses)
+    while True:
+        chunk = list(islice(masses, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def chunk_fuel(masses: List[int], include_fuel_mass: bool = False) -> int:
+    """
+    Return the total fuel for a chunk of masses, as an int64 array if they
+    all fit, otherwise one at a time.
+    """
+    import numpy as np
+    try:
+        array = np.fromiter(masses, dtype=np.int64, count=len(masses))
+    except OverflowError:
+        return total_fuel(masses, include_fuel_mass)
+    return array_fuel(array, include_fuel_mass)
+
+
+def array_fuel(masses: Any, include_fuel_mass: bool = False) -> int:
+    """
+    Return the total fuel for an int64 array of masses. With the fuel's
+    own mass included, the mass // 3 - 2 step is repeated on the fuel
+    values that are still positive until none are left. Sums that could
+    overflow int64 are added up as Python ints.
+    """
+    total = 0
+    fuel = masses // 3 - 2
+    while True:
+        fuel = fuel[fuel > 0]
+        if not fuel.size:
+            return total
+        if int(fuel.max()) * fuel.size <= INT64_MAX:
+            total += int(fuel.sum())
+        else:
+            total += sum(fuel.tolist())
+        if not include_fuel_mass:
+            return total
+        fuel = fuel // 3 - 2
+
+
+@contextmanager
+def open_manifest(inputfile: str) -> Iterator[BinaryIO]:
+    """
+    Open a manifest of masses for reading bytes. '-' is stdin. Files
+    compressed with gzip, bzip2 or xz are recognised by their first bytes
+    and decompressed as they are read.
+    """
+    if inputfile == '-':
+        yield decompressed(sys.stdin.buffer)
+        return
+    with open(inputfile, 'rb') as f:
+        with decompressed(f) as stream:
+            yield stream
+
+
+def decompressed(stream: Any) -> BinaryIO:
+    head = stream.peek(8)
+    for magic, opener in COMPRESSED:
+        if head.startswith(magic):
+            return opener(stream)
+    return stream
+
+
 def parse_input(inputfile: str) -> Iterable[int]:
-    for line in open(inputfile):
-        yield int(line)
+    with open_manifest(inputfile) as f:
+        for line in f:
+            yield int(line)
+
+
+def read_blocks(stream: BinaryIO, block_size: int) -> Iterator[bytes]:
+    """
+    Read a stream block_size bytes at a time, and yield blocks of whole
+    lines, each ending with a newline. The next block is read in another
+    thread while the caller works on the current one.
+    """
+    with ThreadPoolExecutor(max_workers=1) as reader:
+        pending = reader.submit(stream.read, block_size)
+        rest = b''
+        while True:
+            data = pending.result()
+            if not data:
+                break
+            pending = reader.submit(stream.read, block_size)
+            block = rest + data
+            end = block.rfind(b'\n') + 1
+            rest = block[end:]
+            if end:
+                yield block[:end]
+        if rest.strip():
+            yield rest + b'\n'
+
+
+def parse_block(block: bytes) -> Any:
+    """
+    Parse a block of lines into an int64 array in one call. If NumPy cannot
+    parse it exactly, because it has blank lines, text that is not an int,
+    or masses it would clamp to the int64 range, parse it line by line, as
+    parse_input does but skipping blank lines, and return a list of ints.
+    """
+    import numpy as np
+    try:
+        masses = np.fromstring(block, dtype=np.int64, sep='\n')
+    except ValueError:
+        masses = None
+    if (masses is None or len(masses) != block.count(b'\n')
+            or masses.min() == INT64_MIN or masses.max() == INT64_MAX
+            # NumPy reads a sign on its own, or a lone blank line, as 0
+            or not masses.all() and (LONE_SIGN.search(block)
+                                     or not block.strip())):
+        return [int(line) for line in block.splitlines() if line.strip()]
+    return masses
+
+
+def stream_total_fuel(
+        inputfile: str,
+        include_fuel_mass: bool = False,
+        block_size: int = BLOCK_SIZE) -> int:
+    """
+    Add up the fuel required for every mass in a manifest, as for
+    total_fuel, reading it in blocks and computing with NumPy arrays a
+    block at a time, so memory use stays constant however big it is.
+    Blank lines are skipped.
+    """
+    total = 0
+    with open_manifest(inputfile) as f:
+        for block in read_blocks(f, block_size):
+            masses = parse_block(block)
+            if isinstance(masses, list):
+                total += chunk_fuel(masses, include_fuel_mass)
+            else:
+                total += array_fuel(masses, include_fuel_mass)
+    return total
 
 
 def part1(inputfile: str) -> int:
@@ -29,5 +197,12 @@ def part2(inputfile: str) -> int:
 
 
 if __name__ == '__main__':
-    print(part1('input_day01.txt'))
-    print(part2('input_day01.txt'))
+    # With a manifest, or '-' for stdin, print the fuel it needs, including
+    # the fuel's own mass with --fuel-mass.
+    arguments = [x for x in sys.argv[1:] if x != '--fuel-mass']
+    if arguments:
+        for manifest in arguments:
+            print(stream_total_fuel(manifest, '--fuel-mass' in sys.argv))
+    else:
+        print(part1('input_day01.txt'))
+        print(part2('input_day01.txt'))
@@ -1,6 +1,9 @@
+import sys
 from itertools import product
 from operator import add, mul
-from typing import Any, Callable, Dict, List, Union
+from time import perf_counter
+from typing import (Any, Callable, Dict, Iterable, List, Optional, Sequence,
+                    Tuple, Union)
 
 
 operations: Dict[int, Callable] = {
@@ -8,6 +11,13 @@ operations: Dict[int, Callable] = {
     2: mul,
 }
 
+# A polynomial in the noun and verb, as {(noun power, verb power): coeff}.
+# None stands for a value that cannot be expressed without running.
+Expression = Optional[Dict[Tuple[int, int], int]]
+
+NOUN: Expression = {(1, 0): 1}
+VERB: Expression = {(0, 1): 1}
+
 
 def parse_input(inputfile: str) -> List[int]:
     """
@@ -18,20 +28,20 @@ def parse_input(inputfile: str) -> List[int]:
 
 def step(program: List[int], position: int = 0) -> List[int]:
     """
-    Execute the opcode at a given position in the program. Continue calling
-    step until reaching opcode 99 and halt the program, returning the final
-    state.
+    Execute opcodes from a given position in the program until reaching
+    opcode 99 and halt the program, returning the final state. The program
+    is changed in place.
     """
-    opcode = program[position]
-    if opcode == 99:
-        return program
-    else:
+    while True:
+        opcode = program[position]
+        if opcode == 99:
+            return program
         operation = operations[opcode]
         a = program[program[position+1]]
         b = program[program[position+2]]
         out = program[position+3]
         program[out] = operation(a, b)
-        return step(program, position+4)
+        position += 4
 
 
 def set_inputs(program: List[int], noun: int, verb: int) -> List[int]:
@@ -58,20 +68,161 @@ def part1(inputfile: str) -> int:
     return final_state[0]
 
 
-def determine_inputs(program: List[int], output: int) -> Any:
+def determine_inputs(
+        program: List[int],
+        output: int,
+        nouns: Sequence[int] = range(100),
+        verbs: Sequence[int] = range(100),
+        symbolic: bool = False) -> Any:
     """
     Try input nouns and verbs 0-99 inclusive until getting desired output
-    from a given program. Otherwise return False.
+    from a given program. Otherwise return False. Every trial runs in one
+    scratch copy of the program, refilled in place. In symbolic mode, run
+    the program once with the noun and verb as unknowns and solve for them,
+    falling back to trying every pair if position 0 cannot be expressed.
     """
-    for noun, verb in product(range(100), range(100)):
-        temp_program = [x for x in program]
-        initialized_program = set_inputs(temp_program, noun, verb)
+    if symbolic:
+        expression = symbolic_step(program)
+        if expression is not None:
+            return solve_inputs(expression, output, nouns, verbs)
+    scratch = list(program)  # reused by every trial
+    for noun, verb in product(nouns, verbs):
+        scratch[:] = program
+        initialized_program = set_inputs(scratch, noun, verb)
         temp_output = step(initialized_program)[0]
         if temp_output == output:
             return (noun, verb)
     return False
 
 
+def batch_determine_inputs(
+        program: List[int],
+        output: int,
+        nouns: Sequence[int] = range(100),
+        verbs: Sequence[int] = range(100)) -> Any:
+    """
+    Run the program for every noun and verb pair at once on the NumPy batch
+    engine, and return the first pair that gives the desired output.
+    Otherwise return False.
+    """
+    import numpy as np
+    from intcode_batch import BatchComputer
+    batch = BatchComputer(program, len(nouns) * len(verbs))
+    batch.memory[:, 1] = np.repeat(np.asarray(nouns), len(verbs))
+    batch.memory[:, 2] = np.tile(np.asarray(verbs), len(nouns))
+    batch.run()
+    for index, value in enumerate(batch.values_at(0)):
+        if value == output:
+            return (nouns[index // len(verbs)], verbs[index % len(verbs)])
+    return False
+
+
+def symbolic_add(a: Expression, b: Expression) -> Expression:
+    """
+    Add two expressions.
+    """
+    if a is None or b is None:
+        return None
+    total = dict(a)
+    for power, coeff in b.items():
+        total[power] = total.get(power, 0) + coeff
+    return {power: coeff for power, coeff in total.items() if coeff}
+
+
+def symbolic_mul(a: Expression, b: Expression) -> Expression:
+    """
+    Multiply two expressions.
+    """
+    if a is None or b is None:
+        return None
+    result: Dict[Tuple[int, int], int] = {}
+    for (i, j), x in a.items():
+        for (k, m), y in b.items():
+            power = (i + k, j + m)
+            result[power] = result.get(power, 0) + x * y
+    return {power: coeff for power, coeff in result.items() if coeff}
+
+
+symbolic_operations: Dict[int, Callable] = {
+    1: symbolic_add,
+    2: symbolic_mul,
+}
+
+
+def constant(expression: Expression) -> Optional[int]:
+    """
+    Return the value of an expression that does not depend on the inputs.
+    """
+    if expression is None or any(power != (0, 0) for power in expression):
+        return None
+    return expression.get((0, 0), 0)
+
+
+def symbolic_step(program: List[int]) -> Expression:
+    """
+    Execute the program with memory holding expressions in the noun and
+    verb, and return the expression left at position 0. Values read through
+    an address that depends on the inputs are unknown, which is fine as long
+    as they are overwritten before they matter. Return None if an opcode,
+    an address written to, or the final result is not known.
+    """
+    memory: List[Expression] = [{(0, 0): x} if x else {} for x in program]
+    memory[1], memory[2] = NOUN, VERB
+    position = 0
+    while True:
+        opcode = constant(memory[position])
+        if opcode == 99:
+            return memory[0]
+        elif opcode not in symbolic_operations:
+            return None
+        a, b, out = (constant(x) for x in memory[position+1:position+4])
+        if out is None or not 0 <= out < len(memory):
+            return None
+        memory[out] = symbolic_operations[opcode](
+            memory[a] if a is not None and 0 <= a < len(memory) else None,
+            memory[b] if b is not None and 0 <= b < len(memory) else None)
+        position += 4
+
+
+def solve_inputs(
+        expression: Dict[Tuple[int, int], int],
+        output: int,
+        nouns: Iterable[int],
+        verbs: Sequence[int]) -> Any:
+    """
+    Find the first noun and verb, in the same order as trying every pair,
+    for which the expression equals output. For each noun the expression is
+    a polynomial in the verb: solve it directly if it is linear, otherwise
+    scan the verbs, stopping early once an increasing polynomial passes the
+    output. Return False if there is no solution.
+    """
+    verb_set = set(verbs)
+    for noun in nouns:
+        coeffs: Dict[int, int] = {}  # verb power -> coeff
+        for (i, j), coeff in expression.items():
+            coeffs[j] = coeffs.get(j, 0) + coeff * noun ** i
+        degree = max((j for j, c in coeffs.items() if c), default=0)
+        if degree == 0:
+            if coeffs.get(0, 0) == output and verbs:
+                return (noun, verbs[0])
+        elif degree == 1:
+            remainder = output - coeffs.get(0, 0)
+            verb, left = divmod(remainder, coeffs[1])
+            if not left and verb in verb_set:
+                return (noun, verb)
+        else:
+            increasing = (all(c >= 0 for c in coeffs.values()) and
+                          all(v >= 0 for v in verbs) and
+                          list(verbs) == sorted(verbs))
+            for verb in verbs:
+                value = sum(c * verb ** j for j, c in coeffs.items())
+                if value == output:
+                    return (noun, verb)
+                elif increasing and value > output:
+                    break
+    return False
+
+
 def part2(inputfile: str) -> Union[int, str]:
     """
     Find the input noun and verb that cause the program to produce the
@@ -79,7 +230,7 @@ def part2(inputfile: str) -> Union[int, str]:
     and verb=2, the answer would be 1202.)
     """
     program = parse_input(inputfile)
-    result = determine_inputs(program, 19690720)
+    result = determine_inputs(program, 19690720, symbolic=True)
     if result:
         noun, verb = result
         return 100 * noun + verb
@@ -87,6 +238,48 @@ def part2(inputfile: str) -> Union[int, str]:
         return 'No Solution'
 
 
+def make_program(length: int) -> List[int]:
+    """
+    Build a gravity-assist program of length instructions, alternating add
+    and multiply over three data values after the code, that leaves 2 at
+    position 0.
+    """
+    data = 4 * length + 1
+    program: List[int] = []
+    for i in range(length):
+        if i % 2:
+            program += [2, data + 2, data, 0]  # 0 = sum * 1
+        else:
+            program += [1, data, data + 1, data + 2]  # sum = 1 + 1
+    return program + [99, 1, 1, 0]
+
+
+def scaling_report(
+        lengths: Sequence[int] = (100, 1000, 10000, 100000),
+        repeat: int = 5) -> List[str]:
+    """
+    Time step on programs of each length, from a scratch buffer refilled
+    before every run. Return a line per length with the best time and the
+    time per instruction.
+    """
+    lines = []
+    for length in lengths:
+        program = make_program(length)
+        scratch = list(program)
+        best = float('inf')
+        for _ in range(repeat):
+            scratch[:] = program
+            start = perf_counter()
+            step(scratch)
+            best = min(best, perf_counter() - start)
+        lines.append(f'{length} instructions: {best * 1e3:.2f} ms, ' +
+                     f'{best / length * 1e9:.0f} ns per instruction')
+    return lines
+
+
 if __name__ == '__main__':
-    print(part1('input_day02.txt'))
-    print(part2('input_day02.txt'))
+    if sys.argv[1:] == ['benchmark']:
+        print('\n'.join(scaling_report()))
+    else:
+        print(part1('input_day02.txt'))
+        print(part2('input_day02.txt'))
@@ -1,5 +1,8 @@
 from itertools import zip_longest
-from typing import Callable, Dict, List, Tuple
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from intcode import Computer
+from intcode_io import DequeChannel
 
 
 def program_add(
@@ -206,18 +209,54 @@ def parse_parameters(
 
 def step(program: List[str], pointer: int = 0) -> Tuple[List[str], int]:
     """
-    Execute the instruction at the given position in the program. Continue
-    calling step until reaching opcode 99 and halt the program, returning the
-    final state of memory.
+    Execute instructions from the given position in the program until
+    reaching opcode 99 and halt the program, returning the final state of
+    memory and the pointer.
     """
-    opcode, *modes = parse_opvalue(program[pointer])
-    if opcode == 99:  # halt
-        return program, pointer
-    else:
+    while True:
+        opcode, *modes = parse_opvalue(program[pointer])
+        if opcode == 99:  # halt
+            return program, pointer
         op = operations[opcode]
         args = parse_parameters(program, pointer, modes)
         program, pointer = op(program, pointer, *args)
-        return step(program, pointer)
+
+
+def diagnostics(
+        program: List[int],
+        system_ids: Iterable[int]) -> Dict[int, List[int]]:
+    """
+    Run the diagnostic program once for each system ID and return the
+    outputs of each run, by ID. The runs share one intcode Computer, with
+    int memory, which is reset between them and starts each run from the
+    program's first input instruction.
+    """
+    computer = Computer(program,
+                        input_channel=DequeChannel(),
+                        checkpoint=True)
+    results: Dict[int, List[int]] = {}
+    for system_id in system_ids:
+        if system_id not in results:
+            computer.reset_written()
+            results[system_id] = computer.run(with_inputs=[system_id])
+    return results
+
+
+def diagnostic_codes(
+        inputfile: str,
+        system_ids: Iterable[int]) -> Dict[int, int]:
+    """
+    Return the diagnostic code, the last output, for each system ID. Every
+    output before it is a test result, which must be 0.
+    """
+    program = Computer.parse_file(inputfile)
+    codes = {}
+    for system_id, outputs in diagnostics(program, system_ids).items():
+        *tests, code = outputs
+        if any(tests):
+            raise ValueError(f'System ID {system_id} failed tests: {tests}')
+        codes[system_id] = code
+    return codes
 
 
 def main(inputfile: str) -> Tuple[List[str], int]:
@@ -231,5 +270,21 @@ def main(inputfile: str) -> Tuple[List[str], int]:
     return memory, pointer
 
 
+def part1(inputfile: str) -> int:
+    """
+    After providing 1 to the only input instruction and passing all the
+    tests, what diagnostic code does the program produce?
+    """
+    return diagnostic_codes(inputfile, [1])[1]
+
+
+def part2(inputfile: str) -> int:
+    """
+    What is the diagnostic code for system ID 5?
+    """
+    return diagnostic_codes(inputfile, [5])[5]
+
+
 if __name__ == '__main__':
-    main('input_day05.txt')
+    print(part1('input_day05.txt'))
+    print(part2('input_day05.txt'))
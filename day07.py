@@ -1,18 +1,172 @@
-from itertools import permutations
-from typing import Callable, List, Iterable, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import permutations, repeat
+from math import perm
+from typing import Callable, Dict, List, Iterable, Tuple
 
-from intcode import Computer
+from intcode import Computer, Intcodes
+
+
+Thrust = Tuple[int, Tuple[int, ...]]
+SignalMemo = Dict[Tuple[int, int, int], int]  # (amp, phase, input) -> output
+
+worker_amps: List[Computer] = []  # amps owned by a max_thrust worker process
+worker_memo: SignalMemo = {}  # shared by every task in a worker process
+
+
+def max_feedback_thrust(
+        amps: List[Computer],
+        phases: Iterable[int],
+        workers: int = 1) -> Thrust:
+    '''
+    Find the max thrust of the amps in a feedback loop by varying the phase
+    setting on each amp. Return the max thrust and corresponding sequence of
+    settings in a tuple. With more than one worker, search the permutations
+    in a process pool.
+    '''
+    if workers > 1:
+        return parallel_max_thrust(amps, tuple(phases), workers,
+                                   task=prefix_max_feedback_thrust)
+    return max((feedback_thrust(amps, settings), settings)
+               for settings in permutations(phases))
 
 
 def max_thrust(
         amps: List[Computer],
-        phases: Iterable[int]) -> Tuple[int, Tuple[int, ...]]:
+        phases: Iterable[int],
+        workers: int = 1) -> Thrust:
     '''
     Find the max thrust by varying the phase setting on each amp.
     Return the max thrust and corresponding sequence of settings in a tuple.
+    With more than one worker, search the permutations in a process pool.
     '''
-    return max((thrust(amps, settings), settings)
-               for settings in permutations(phases))
+    if workers > 1:
+        return parallel_max_thrust(amps, tuple(phases), workers)
+    return search_thrust(amps, tuple(phases), (), {})
+
+
+def search_thrust(
+        amps: List[Computer],
+        phases: Tuple[int, ...],
+        prefix: Tuple[int, ...],
+        memo: SignalMemo) -> Thrust:
+    '''
+    Walk the tree of phase permutations that start with the phases at the
+    prefix indices, depth first, so permutations sharing leading phases
+    share the amp runs for them. Amp outputs are memoized by amp, phase
+    and input signal. Return the max thrust and its settings.
+    '''
+    if (amp_len := len(amps)) != (phase_len := len(phases)):
+        raise ValueError(f'Length of amps ({amp_len}) and ' +
+                         f'phase_settings ({phase_len}) must match.')
+
+    def walk(chosen: Tuple[int, ...], signal: int) -> Thrust:
+        if len(chosen) == len(phases):
+            return signal, tuple(phases[i] for i in chosen)
+        if len(chosen) < len(prefix):
+            indices = [prefix[len(chosen)]]
+        else:
+            indices = [i for i in range(len(phases)) if i not in chosen]
+        return max(walk(chosen + (i,),
+                        amp_signal(amps, memo, len(chosen), phases[i], signal))
+                   for i in indices)
+
+    return walk((), 0)
+
+
+def amp_signal(
+        amps: List[Computer],
+        memo: SignalMemo,
+        position: int,
+        phase: int,
+        signal: int) -> int:
+    '''
+    Return the first output of the amp at position for the given phase
+    setting and input signal, running it only if it has not been seen.
+    '''
+    key = (position, phase, signal)
+    if key not in memo:
+        amp = amps[position]
+        amp.reset_written()
+        memo[key] = amp.run(with_inputs=[phase, signal],
+                            stop_at_first_output=True)[0]
+    return memo[key]
+
+
+def prefix_max_thrust(
+        prefix: Tuple[int, ...],
+        phases: Tuple[int, ...]) -> Thrust:
+    '''
+    Find the max thrust over the permutations of phases that start with the
+    phases at the given indices, reusing amp outputs from earlier tasks.
+    '''
+    return search_thrust(worker_amps, phases, prefix, worker_memo)
+
+
+def prefix_max_feedback_thrust(
+        prefix: Tuple[int, ...],
+        phases: Tuple[int, ...]) -> Thrust:
+    '''
+    Find the max feedback loop thrust over the permutations of phases that
+    start with the phases at the given indices.
+    '''
+    rest = [i for i in range(len(phases)) if i not in prefix]
+    return max((feedback_thrust(worker_amps, settings), settings)
+               for settings in (tuple(phases[i] for i in prefix + tail)
+                                for tail in permutations(rest)))
+
+
+def parallel_max_thrust(
+        amps: List[Computer],
+        phases: Tuple[int, ...],
+        workers: int,
+        task: Callable[..., Thrust] = prefix_max_thrust) -> Thrust:
+    '''
+    Split the phase permutations by their leading phases, long enough to
+    give each worker several tasks, and take the best of the local maxima
+    found by task. Every worker builds its own amps once, from the first
+    amp's program.
+    '''
+    prefix_len = 1
+    while (prefix_len < len(phases) and
+           perm(len(phases), prefix_len) < 4 * workers):
+        prefix_len += 1
+    prefixes = permutations(range(len(phases)), prefix_len)
+    program = amps[0].original_program
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=init_worker,
+                             initargs=(program, len(amps), amps[0].engine)
+                             ) as pool:
+        return max(pool.map(task, prefixes, repeat(phases)))
+
+
+def init_worker(program: Intcodes, num_amps: int, engine: str) -> None:
+    '''
+    Build the amps used by every task in a max_thrust worker process.
+    '''
+    worker_amps[:] = [Computer(program, engine=engine)
+                      for _ in range(num_amps)]
+    worker_memo.clear()
+
+
+def batch_max_thrust(
+        amps: List[Computer],
+        phases: Iterable[int]) -> Thrust:
+    '''
+    Find the max thrust like max_thrust, running each amp position for all
+    the permutations at once on the NumPy batch engine. Each amp's signal
+    is its first output.
+    '''
+    from intcode_batch import run_batch
+    program = amps[0].original_program
+    settings = list(permutations(phases))
+    signals = [0] * len(settings)
+    for position in range(len(amps)):
+        outputs = run_batch(program,
+                            [[phase_settings[position], signal]
+                             for phase_settings, signal
+                             in zip(settings, signals)])
+        signals = [amp_output[0] for amp_output in outputs]
+    return max(zip(signals, settings))
 
 
 def thrust(
@@ -26,7 +180,7 @@ def thrust(
         raise ValueError(f'Length of amps ({amp_len}) and ' +
                          f'phase_settings ({phase_len}) must match.')
     for amp in amps:
-        amp.initialize_memory()  # reset program memory, pointer, and outputs
+        amp.reset_written()  # reset memory, pointer and outputs
     amp_input: int = 0
     for amp, phase_setting in zip(amps, phase_settings):
         amp_output = amp.run(with_inputs=[phase_setting, amp_input],
@@ -36,18 +190,54 @@ def thrust(
     return amp_output[0]
 
 
+def feedback_thrust(
+        amps: List[Computer],
+        phase_settings: Tuple[int, ...]) -> int:
+    '''
+    Compute the thrust signal of the amps connected in a feedback loop, the
+    last amp's output going back into the first, until the amps halt. The
+    amps run as suspended generators, taking turns: each signal is sent
+    straight into the next amp, which runs until its next output. Return
+    the last signal sent to the thrusters.
+    '''
+    if (amp_len := len(amps)) != (phase_len := len(phase_settings)):
+        raise ValueError(f'Length of amps ({amp_len}) and ' +
+                         f'phase_settings ({phase_len}) must match.')
+    machines = []
+    for amp, phase_setting in zip(amps, phase_settings):
+        amp.reset_written()
+        amp.set_inputs([phase_setting])
+        machine = amp.execute()
+        next(machine, None)  # run up to the first input after the phase
+        machines.append(machine)
+    signal = 0
+    while True:
+        for machine in machines:
+            try:
+                output = machine.send(signal)
+            except StopIteration:
+                return signal
+            if output is None:
+                raise RuntimeError('Amp asked for a second input before ' +
+                                   'producing an output.')
+            signal = output
+
+
 def amp_series(
         num_amps: int,
         program: str,
         from_file: bool = True) -> List[Computer]:
     '''
-    Build a series of amps with software defined by the given program.
+    Build a series of amps with software defined by the given program. The
+    program is parsed once and shared by every amp. The thrust functions
+    reset amps with reset_written, so amps must only be changed by running
+    them.
     '''
     if from_file:
-        Constructor: Callable = Computer.from_file
+        intcodes = Computer.parse_file(program)
     else:
-        Constructor = Computer.from_text
-    return [Constructor(program) for _ in range(num_amps)]
+        intcodes = Computer.parse_text(program)
+    return [Computer(intcodes) for _ in range(num_amps)]
 
 
 def part1(inputfile: str) -> int:
@@ -60,5 +250,17 @@ def part1(inputfile: str) -> int:
     return thrust
 
 
+def part2(inputfile: str) -> int:
+    '''
+    Try every combination of the new phase settings on the amplifier
+    feedback loop. What is the highest signal that can be sent to the
+    thrusters?
+    '''
+    amps = amp_series(5, inputfile)
+    thrust, _ = max_feedback_thrust(amps, range(5, 10))
+    return thrust
+
+
 if __name__ == '__main__':
     print(part1('input_day07.txt'))
+    print(part2('input_day07.txt'))
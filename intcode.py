@@ -1,10 +1,37 @@
 from __future__ import annotations
+import asyncio
 from collections import deque
+from copy import copy
+from functools import partial
 from itertools import zip_longest
-from typing import Callable, Deque, Dict, List, Optional, Tuple
+from time import perf_counter
+from typing import (AsyncIterator, Callable, Deque, Dict, FrozenSet,
+                    Generator, List, NamedTuple, Optional, Set, Tuple)
+
+import intcode_format
+from intcode_compiler import Block, compile_block
+from intcode_guard import Guard, Limits
+from intcode_io import Channel, ConsoleChannel, DequeChannel
+from intcode_memory import BACKENDS, PAGE_BITS, PAGE_SIZE, Memory, PagedMemory
+from intcode_peephole import FUSED, Superinstruction, fetch_memory, fuse
+from intcode_profile import Profile
 
 
 Intcodes = List[int]
+# (opcode, modes, handler, fetcher, opvalue decoded)
+Instruction = Tuple[int, Tuple[int, ...], Optional[Callable], Callable, int]
+
+# Most instructions run looking for a program's first input point.
+PREFIX_BUDGET: int = 1_000_000
+# Most input points cached, the least recently used are dropped first.
+INPUT_POINTS: int = 64
+
+
+class Snapshot(NamedTuple):
+    memory: Memory  # frozen pages shared with the source, or flat memory
+    pointer: int
+    inputs: Tuple[int, ...]
+    outputs: Tuple[int, ...]
 
 
 class Computer:
@@ -20,16 +47,65 @@ class Computer:
         8: 3,  # equals
         99: 0  # halt
     }
+    # opcodes that store a value at their last parameter
+    stores: FrozenSet[int] = frozenset({1, 2, 3, 7, 8})
 
-    def __init__(self, program: Intcodes) -> None:
-        '''
-        Initialize a new Computer.
-        '''
-        self.original_program: Intcodes = program
-        self.initialize_memory()
-        self.set_inputs()
-        self.log_output: bool = False
+    _fetchers: Dict[Tuple[int, ...], Callable] = {}  # modes -> fetcher
+    # (program, budget) -> state at the first input point, or None
+    _input_points: Dict[Tuple[Tuple[int, ...], int], Optional[Snapshot]] = {}
 
+    def __init__(
+            self,
+            program: Intcodes,
+            engine: str = 'interpreter',
+            snapshot: Optional[Snapshot] = None,
+            backend: str = 'list',
+            profile: bool = False,
+            input_channel: Optional[Channel] = None,
+            output_channel: Optional[Channel] = None,
+            peephole: bool = False,
+            checkpoint: bool = False,
+            limits: Optional[Limits] = None) -> None:
+        '''
+        Initialize a new Computer. The engine is either 'interpreter', which
+        decodes and dispatches one instruction at a time, or 'compiled',
+        which turns straight-line code into Python functions. If a snapshot
+        is given, start from it instead of a fresh copy of the program.
+        The backend chooses how memory is stored: 'list', 'array' (flat
+        int64, moving to a list if a value overflows), 'paged' (copy on
+        write) or 'sparse' (paged, and addressable past the program).
+        With profile, runs count every instruction executed, per opcode and
+        address, in self.profile. Profiling uses the interpreter.
+        Inputs are taken from self.inputs first, then from input_channel
+        (the console by default). If output_channel is given, outputs are
+        sent to it instead of being collected in self.outputs.
+        With peephole, the interpreter fuses common instruction sequences in
+        unmodified code into single superinstructions as it decodes them.
+        With checkpoint, every reset starts from the state at the program's
+        first input point (see input_point) instead of from address 0,
+        unless the program outputs anything before it. Finding that point
+        runs the program for up to PREFIX_BUDGET (a million) instructions
+        here, once per program while it stays cached.
+        With limits, runs raise LoopError when they take too many steps or
+        too long, or, if limits.cycles, when the state repeats. This holds
+        for run, execute, execute_async and run_slice, where a run goes on
+        across slices until it halts or memory is reset. Guarded runs use
+        the interpreter.
+        '''
+        if backend not in BACKENDS:
+            raise ValueError(f'Unknown backend {backend!r}, expected one ' +
+                             f'of {sorted(BACKENDS)}.')
+        self.original_program: Intcodes = program
+        self.backend: str = backend
+        self.image: Memory = BACKENDS[backend](program)  # copied on reset
+        self.start_pointer: int = 0  # pointer after a reset
+        self.decoded: Dict[int, Instruction] = {}  # address -> instruction
+        self.blocks: Dict[int, Optional[Block]] = {}  # start -> block
+        self.covered: Dict[int, Set[int]] = {}  # address -> block starts
+        self.superinstructions: Dict[int, Optional[Superinstruction]] = {}
+        self.fused: Dict[int, Set[int]] = {}  # address -> fused starts
+        self.dirty: Set[int] = set()  # pages written since the last reset
+        self.tracked: Optional[Memory] = None  # memory with dirty pages known
         self.operations: Dict[int, Callable] = {  # opcode -> function
             1: self.add,
             2: self.mul,
@@ -40,12 +116,204 @@ class Computer:
             7: self.clt,
             8: self.ceq,
         }
+        engines: Dict[str, Callable] = {
+            'interpreter': self.interpret,
+            'compiled': self.run_compiled,
+        }
+        if engine not in engines:
+            raise ValueError(f'Unknown engine {engine!r}, expected one of ' +
+                             f'{sorted(engines)}.')
+        if profile and engine != 'interpreter':
+            raise ValueError('Profiling counts single instructions and ' +
+                             'needs the interpreter engine.')
+        if peephole and (engine != 'interpreter' or profile):
+            raise ValueError('The peephole pass needs the interpreter ' +
+                             'engine, without profiling.')
+        if limits is not None and (engine != 'interpreter' or profile
+                                   or peephole):
+            raise ValueError('Guarded runs check single instructions and ' +
+                             'need the plain interpreter engine.')
+        self.peephole: bool = peephole
+        self.engine: str = engine
+        self.runner: Callable[[bool], List[int]] = engines[engine]
+        self.profile: Optional[Profile] = None
+        if profile:
+            names = {op: f.__name__ for op, f in self.operations.items()}
+            names[99] = 'halt'
+            self.profile = Profile(names)
+            self.runner = self.interpret_profiled
+        self.limits: Optional[Limits] = limits
+        self.guard: Optional[Guard] = None  # the guarded run being sliced
+        if limits is not None:
+            self.runner = self.interpret_guarded
+        self.input_channel: Channel = input_channel or ConsoleChannel()
+        self.output_channel: Optional[Channel] = output_channel
+        self.checkpoint: bool = checkpoint
+        if checkpoint:
+            self.start_from_input_point()
+        self.set_inputs()
+        if snapshot is None:
+            self.initialize_memory()
+        else:
+            self.restore(snapshot)
+        self.log_output: bool = False
 
     def initialize_memory(self) -> None:
-        self.memory: Intcodes = [x for x in self.original_program]
-        self.pointer = 0
+        '''
+        Reset memory to the program, the pointer to 0 and clear the outputs.
+        '''
+        self.memory: Memory = copy(self.image)
+        # Paged memory is already copied page by page, on write.
+        self.tracked = (None if isinstance(self.memory, PagedMemory)
+                        else self.memory)
+        self.dirty.clear()
+        self.pointer = self.start_pointer
+        self.guard = None
         self.outputs: List[int] = []
 
+    def reset_written(self) -> None:
+        '''
+        Reset as initialize_memory does, but restore flat memory in place,
+        copying only the pages written since the last reset. Only writes
+        made by running the computer are tracked, so this must not be used
+        after changing memory any other way, such as by assigning to
+        computer.memory[address].
+        '''
+        if (self.tracked is None or self.memory is not self.tracked
+                or len(self.dirty) * PAGE_SIZE >= len(self.image)):
+            self.initialize_memory()
+            return
+        memory, image = self.memory, self.image
+        for page in self.dirty:
+            start = page << PAGE_BITS
+            end = start + PAGE_SIZE
+            memory[start:end] = image[start:end]
+        self.dirty.clear()
+        self.pointer = self.start_pointer
+        self.guard = None
+        self.outputs = []
+
+    @classmethod
+    def input_point(
+            cls,
+            program: Intcodes,
+            budget: int = PREFIX_BUDGET) -> Optional[Snapshot]:
+        '''
+        Return the state of the program when it first needs an input, or
+        halts, having run without any. Every run reaches this state whatever
+        its inputs, so it is cached for the last INPUT_POINTS programs and
+        budgets asked for. Return None if the program runs for more than
+        budget instructions first, or fails before then.
+        '''
+        cache = cls._input_points
+        key = (tuple(program), budget)
+        if key in cache:
+            cache[key] = cache.pop(key)  # now the most recently used
+            return cache[key]
+        computer = cls(program, input_channel=DequeChannel())
+        try:
+            status, _ = computer.run_slice(budget)
+        except Exception:
+            # Every run fails here the same way, and raises it itself.
+            status = 'failed'
+        if len(cache) >= INPUT_POINTS:
+            del cache[next(iter(cache))]
+        point = cache[key] = (None if status in ('ready', 'failed')
+                              else computer.snapshot())
+        return point
+
+    def start_from_input_point(self) -> None:
+        '''
+        Make resets start from the program's first input point, so the
+        instructions before it are not run again. This is skipped if the
+        program outputs anything before then, as runs would no longer
+        produce those outputs.
+        '''
+        point = self.input_point(self.original_program)
+        if point is None or point.outputs:
+            return
+        values = list(point.memory)
+        self.image = BACKENDS[self.backend](values)
+        self.tracked = None  # the image changed, copy it in full
+        self.start_pointer = point.pointer
+
+    def snapshot(self) -> Snapshot:
+        '''
+        Capture the memory, pointer, inputs and outputs. Paged memory is
+        shared with the snapshot and copied page by page on later writes.
+        Flat memory is split into pages, which costs about as much as
+        copying it.
+        '''
+        if isinstance(self.memory, PagedMemory):
+            memory = self.memory.copy()
+        else:
+            memory = PagedMemory.from_values(self.memory)
+        return Snapshot(memory,
+                        self.pointer,
+                        tuple(self.inputs),
+                        tuple(self.outputs))
+
+    def restore(self, snapshot: Snapshot) -> None:
+        '''
+        Return to the state captured in a snapshot. With a paged backend
+        the memory shares the snapshot's pages, so restoring only costs one
+        reference per page; otherwise the values are copied into memory of
+        this computer's backend, which runs faster. Decoded instructions
+        stay cached, as they are checked against memory on use.
+        '''
+        if type(snapshot.memory) is type(self.image):
+            self.memory = copy(snapshot.memory)
+        else:
+            self.memory = BACKENDS[self.backend](snapshot.memory)
+        self.pointer = snapshot.pointer
+        self.guard = None
+        self.inputs = deque(snapshot.inputs)
+        self.outputs = list(snapshot.outputs)
+        for address in list(self.superinstructions):
+            instruction = self.decoded.get(address)
+            if instruction is not None and instruction[0] == FUSED:
+                del self.decoded[address]
+        self.blocks.clear()
+        self.covered.clear()
+        self.superinstructions.clear()
+        self.fused.clear()
+
+    def fork(self) -> Computer:
+        '''
+        Return a new Computer in the same state as this one. With a paged
+        backend the two share memory pages until either of them writes to a
+        page; flat memory is copied, which is cheaper than splitting it into
+        pages. The child keeps the decoded instructions, with their handlers
+        bound to it.
+        '''
+        if isinstance(self.memory, PagedMemory):
+            state = self.snapshot()
+        else:  # restore copies it
+            state = Snapshot(self.memory,
+                             self.pointer,
+                             tuple(self.inputs),
+                             tuple(self.outputs))
+        child = type(self)(self.original_program,
+                           engine=self.engine,
+                           snapshot=state,
+                           backend=self.backend,
+                           profile=self.profile is not None,
+                           input_channel=self.input_channel,
+                           output_channel=self.output_channel,
+                           peephole=self.peephole,
+                           checkpoint=self.checkpoint,
+                           limits=self.limits)
+        # Handlers are bound to this computer, so rebind them to the child.
+        # Superinstructions are left for the child to fuse again.
+        handler = child.operations.get
+        child.decoded = {
+            address: (opcode, modes, handler(opcode), fetch, opvalue)
+            for address, (opcode, modes, _, fetch, opvalue)
+            in self.decoded.items()
+            if opcode != FUSED}
+        child.log_output = self.log_output
+        return child
+
     def set_inputs(self, inputs: Optional[List[int]] = None) -> None:
         if not inputs:
             inputs = []
@@ -61,10 +329,10 @@ class Computer:
     @classmethod
     def parse_file(cls, filename: str) -> Intcodes:
         '''
-        Parse a text file as a list of int opcodes.
+        Parse a text or binary program file as a list of int opcodes. Each
+        file is only parsed once per process while it is unchanged.
         '''
-        text: str = open(filename).read()
-        return cls.parse_text(text)
+        return intcode_format.load(filename)
 
     @classmethod
     def from_text(cls, text: str) -> Computer:
@@ -81,12 +349,30 @@ class Computer:
         '''
         return cls(cls.parse_file(filename))
 
+    def write(self, address: int, value: int) -> None:
+        '''
+        Store value at the given address in memory, invalidating any
+        superinstruction or compiled block covering that address. Fixed-width
+        memory that cannot hold the value is replaced by a list.
+        '''
+        try:
+            self.memory[address] = value
+        except OverflowError:
+            self.memory = list(self.memory)
+            self.memory[address] = value
+        self.dirty.add(address >> PAGE_BITS)
+        if address in self.fused:
+            for start in self.fused.pop(address):
+                self.decoded.pop(start, None)
+        if address in self.covered:
+            self.invalidate_blocks(address)
+
     def add(self, a: int, b: int, address: int) -> None:
         '''
         Opcode: 1
         Add a and b, storing the result in the given address in memory.
         '''
-        self.memory[address] = a + b
+        self.write(address, a + b)
         self.pointer += self.num_params[1] + 1
 
     def mul(self, a: int, b: int, address: int) -> None:
@@ -94,40 +380,37 @@ class Computer:
         Opcode: 2
         Multiply a and b, storing the result in the given address in memory.
         '''
-        self.memory[address] = a * b
+        self.write(address, a * b)
         self.pointer += self.num_params[2] + 1
 
     def inp(self, address: int) -> None:
         '''
         Opcode: 3
-        If program inputs are available, take one. Otherwise get input from
-        the user. Store it at the given address in the memory.
+        If program inputs are available, take one. Otherwise get one from
+        the input channel. Store it at the given address in the memory.
         '''
         if self.inputs:
             program_input = self.inputs.popleft()
-            if self.log_output:
-                print('PROGRAM INPUT: ', program_input)
         else:
-            while True:
-                user_input = input('Enter integer: ')
-                try:
-                    program_input = int(user_input)
-                    break
-                except ValueError as e:
-                    print(e)
-                    print('Invalid input, try again.')
-        self.memory[address] = program_input
+            program_input = self.input_channel.get()
+        if self.log_output:
+            print('PROGRAM INPUT: ', program_input)
+        self.write(address, program_input)
         self.pointer += self.num_params[3] + 1
 
     def out(self, value: int) -> int:
         '''
         Opcode: 4
-        Print the provided value, if log_outputs is enabled. Append the value
-        to program outputs.
+        Print the provided value, if log_outputs is enabled. Send the value
+        to the output channel if there is one, otherwise append it to program
+        outputs.
         '''
         if self.log_output:
             print('PROGRAM OUTPUT: ', value)
-        self.outputs.append(value)
+        if self.output_channel is None:
+            self.outputs.append(value)
+        else:
+            self.output_channel.put(value)
         self.pointer += self.num_params[4] + 1
         return value
 
@@ -157,10 +440,7 @@ class Computer:
         If a is less than b, store 1 at the address in memory.
         Otherwise store 0.
         '''
-        if a < b:
-            self.memory[address] = 1
-        else:
-            self.memory[address] = 0
+        self.write(address, 1 if a < b else 0)
         self.pointer += self.num_params[7] + 1
 
     def ceq(self, a: int, b: int, address: int) -> None:
@@ -169,10 +449,7 @@ class Computer:
         If a is equal to b, store 1 at the address in memory.
         Otherwise store 0.
         '''
-        if a == b:
-            self.memory[address] = 1
-        else:
-            self.memory[address] = 0
+        self.write(address, 1 if a == b else 0)
         self.pointer += self.num_params[8] + 1
 
     @classmethod
@@ -198,7 +475,9 @@ class Computer:
         using the provided parameter modes.
         '''
         parameters = []
-        for mode, value in zip(modes, self.memory[self.pointer + 1:]):
+        start = self.pointer + 1
+        values = self.memory[start:start + len(modes)]
+        for mode, value in zip(modes, values):
             if mode == 0:  # position mode
                 parameter = self.memory[value]
             elif mode == 1:  # immediate mode
@@ -206,6 +485,95 @@ class Computer:
             parameters.append(parameter)
         return parameters
 
+    @classmethod
+    def fetcher(cls, modes: Tuple[int, ...]) -> Callable:
+        '''
+        Return a function of (memory, pointer) that fetches the parameters of
+        an instruction with the given modes. Fetchers are built once per
+        combination of modes and shared by every Computer.
+        '''
+        fetch = cls._fetchers.get(modes)
+        if fetch is None:
+            params = [f'm[m[p + {i}]]' if mode == 0 else f'm[p + {i}]'
+                      for i, mode in enumerate(modes, start=1)]
+            fetch = eval(f'lambda m, p: ({"".join(x + ", " for x in params)})')
+            cls._fetchers[modes] = fetch
+        return fetch
+
+    def decode(self, address: int) -> Instruction:
+        '''
+        Decode the instruction at the given address into its opcode, modes,
+        handler and parameter fetcher, and cache it with the opvalue it was
+        decoded from. Parameters are always fetched from memory, so an entry
+        is valid for as long as memory holds the same opvalue there, however
+        memory was changed. With the peephole pass, a superinstruction
+        starting at the address is cached instead, until any address it
+        covers is written to.
+        '''
+        if self.peephole:
+            fused = self.fuse(address)
+            if fused is not None:
+                instruction: Instruction = (FUSED,
+                                            (),
+                                            partial(fused.function, self),
+                                            fetch_memory,
+                                            self.memory[address])
+                self.decoded[address] = instruction
+                return instruction
+        opvalue = self.memory[address]
+        opcode, *modes = self.parse_opvalue(opvalue)
+        instruction = (opcode,
+                       tuple(modes),
+                       self.operations.get(opcode),
+                       self.fetcher(tuple(modes)),
+                       opvalue)
+        self.decoded[address] = instruction
+        return instruction
+
+    def fuse(self, start: int) -> Optional[Superinstruction]:
+        '''
+        Return the superinstruction beginning at start, if the original
+        program matches a pattern there and that code is unmodified, and
+        record the addresses it covers. Superinstructions depend only on the
+        original program, so each address is only fused once.
+        '''
+        if start in self.superinstructions:
+            fused = self.superinstructions[start]
+        else:
+            fused = self.superinstructions[start] = fuse(self, start)
+        if (fused is None or list(self.memory[start:fused.end]) !=
+                self.original_program[start:fused.end]):
+            return None
+        for address in range(start + 1, fused.end):
+            self.fused.setdefault(address, set()).add(start)
+        return fused
+
+    def compile_block(self, start: int) -> Optional[Block]:
+        '''
+        Compile the block beginning at start and record the addresses it
+        covers, so a write to any of them sends the block back to the
+        interpreter.
+        '''
+        block = self.blocks[start] = compile_block(self, start)
+        if block is not None:
+            for address in range(block.start, block.end):
+                self.covered.setdefault(address, set()).add(start)
+        return block
+
+    def invalidate_blocks(self, address: int) -> None:
+        '''
+        Discard every compiled block covering the given address. Those
+        blocks are interpreted from now on.
+        '''
+        for start in self.covered.pop(address):
+            block = self.blocks[start]
+            self.blocks[start] = None
+            if block is None:
+                continue
+            for other in range(block.start, block.end):
+                if other != address:
+                    self.covered[other].discard(start)
+
     def run(
             self,
             with_inputs: Optional[List[int]] = None,
@@ -218,16 +586,260 @@ class Computer:
         if with_inputs:
             self.set_inputs(with_inputs)
         self.log_output = log_output
+        return self.runner(stop_at_first_output)
+
+    def interpret(self, stop_at_first_output: bool = False) -> List[int]:
+        '''
+        Execute one decoded instruction at a time until halting, or until
+        the first output if requested.
+        '''
+        decoded = self.decoded
         while True:
-            opcode, *modes = self.parse_opvalue(self.memory[self.pointer])
+            pointer = self.pointer
+            instruction = decoded.get(pointer)
+            if (instruction is None
+                    or instruction[4] != self.memory[pointer]):
+                instruction = self.decode(pointer)
+            opcode, _, op, fetch, _ = instruction
             if opcode == 99:  # halt
                 return self.outputs
-            else:
-                op = self.operations[opcode]
-                args = self.parse_parameters(modes)
-                output = op(*args)
+            output = op(*fetch(self.memory, pointer))
+            if stop_at_first_output and output:
+                return self.outputs
+
+    def interpret_profiled(
+            self,
+            stop_at_first_output: bool = False) -> List[int]:
+        '''
+        Interpret like interpret, counting each instruction executed by
+        address and opcode and timing the run.
+        '''
+        decoded = self.decoded
+        executed = self.profile.executed  # type: ignore
+        start = perf_counter()
+        try:
+            while True:
+                pointer = self.pointer
+                instruction = decoded.get(pointer)
+                if (instruction is None
+                        or instruction[4] != self.memory[pointer]):
+                    instruction = self.decode(pointer)
+                opcode, _, op, fetch, _ = instruction
+                executed[pointer, opcode] += 1
+                if opcode == 99:  # halt
+                    return self.outputs
+                output = op(*fetch(self.memory, pointer))
                 if stop_at_first_output and output:
                     return self.outputs
+        finally:
+            self.profile.run_times.append(  # type: ignore
+                perf_counter() - start)
+
+    def interpret_guarded(
+            self,
+            stop_at_first_output: bool = False) -> List[int]:
+        '''
+        Interpret like interpret, executing every instruction through a
+        Guard for self.limits. The error reports the range of the loops
+        jumped over since the last check, or for a cycle, over the cycle.
+        '''
+        guard = Guard(self.limits, self.pointer)  # type: ignore
+        decoded = self.decoded
+        while True:
+            pointer = self.pointer
+            instruction = decoded.get(pointer)
+            if (instruction is None
+                    or instruction[4] != self.memory[pointer]):
+                instruction = self.decode(pointer)
+            opcode, _, op, fetch, _ = instruction
+            if opcode == 99:  # halt
+                return self.outputs
+            output = guard.step(self, pointer, opcode, op,
+                                fetch(self.memory, pointer))
+            if stop_at_first_output and output:
+                return self.outputs
+
+    def run_block(self, pointer: int) -> int:
+        '''
+        Execute the compiled block starting at pointer, compiling it first if
+        needed. Return the number of instructions in the block, or 0 if the
+        instruction there must be interpreted, including when the block's
+        code was changed without going through write().
+        '''
+        if pointer in self.blocks:
+            block = self.blocks[pointer]
+        else:
+            block = self.compile_block(pointer)
+        if block is None:
+            return 0
+        try:
+            pointer = block.function(self.memory)
+            if pointer is None:  # see compile_block
+                return 0
+            self.pointer = pointer
+        except OverflowError as error:
+            # Fixed-width memory could not hold a result. Nothing was stored
+            # for the failing instruction, so resume there with a list. The
+            # first line of a block checks its code.
+            traceback = error.__traceback__
+            while traceback.tb_next is not None:
+                traceback = traceback.tb_next
+            self.pointer = block.addresses[traceback.tb_lineno - 3]
+            self.memory = list(self.memory)
+        self.dirty |= block.pages
+        for address in block.writes:
+            if address in self.covered:
+                self.invalidate_blocks(address)
+        return len(block.addresses)
+
+    def run_compiled(
+            self,
+            stop_at_first_output: bool = False) -> List[int]:
+        '''
+        Execute compiled blocks where possible, interpreting input, output
+        and halt instructions and any code modified at runtime.
+        '''
+        decoded = self.decoded
+        run_block = self.run_block
+        while True:
+            pointer = self.pointer
+            if run_block(pointer):
+                continue
+            instruction = decoded.get(pointer)
+            if (instruction is None
+                    or instruction[4] != self.memory[pointer]):
+                instruction = self.decode(pointer)
+            opcode, _, op, fetch, _ = instruction
+            if opcode == 99:  # halt
+                return self.outputs
+            output = op(*fetch(self.memory, pointer))
+            if stop_at_first_output and output:
+                return self.outputs
+
+    def run_slice(self, budget: int) -> Tuple[str, int]:
+        '''
+        Execute at most budget instructions from the current pointer without
+        ever waiting for input: when none are queued, an input is taken from
+        the input channel only if it can poll one. Return the number
+        executed and why it stopped: 'halted', 'blocked' (an input is needed
+        and none is available) or 'ready' (the budget ran out). A compiled
+        block may overrun the budget by its own length.
+        '''
+        decoded = self.decoded
+        compiled = self.engine == 'compiled'
+        guard = self.guard
+        if self.limits is not None:
+            if guard is None:
+                guard = self.guard = Guard(self.limits, self.pointer)
+            else:
+                guard.resume()
+        executed = 0
+        while executed < budget:
+            pointer = self.pointer
+            if compiled:
+                count = self.run_block(pointer)
+                if count:
+                    executed += count
+                    continue
+            instruction = decoded.get(pointer)
+            if (instruction is None
+                    or instruction[4] != self.memory[pointer]):
+                instruction = self.decode(pointer)
+            opcode, _, op, fetch, _ = instruction
+            if opcode == 99:  # halt
+                self.guard = None
+                return 'halted', executed
+            elif opcode == 3 and not self.inputs:
+                value = self.input_channel.poll()
+                if value is None:
+                    if guard is not None:
+                        guard.pause()
+                    return 'blocked', executed
+                self.inputs.append(value)
+            if guard is None:
+                op(*fetch(self.memory, pointer))
+            else:
+                guard.step(self, pointer, opcode, op,
+                           fetch(self.memory, pointer))
+            executed += 1
+        if guard is not None:
+            guard.pause()
+        return 'ready', executed
+
+    def execute(self) -> Generator[Optional[int], Optional[int], None]:
+        '''
+        Run the program as a generator, from the current pointer until a
+        halt. Yield each output value as it is produced, without adding it
+        to outputs. When an input is needed and none are queued, yield None
+        and wait; resume with send(value), or by adding to inputs and
+        calling next(). A value sent while resuming from an output is
+        queued as an input. With limits, the time spent waiting for the
+        caller does not count.
+        '''
+        decoded = self.decoded
+        compiled = self.engine == 'compiled'
+        guard = (None if self.limits is None
+                 else Guard(self.limits, self.pointer))
+        while True:
+            pointer = self.pointer
+            if compiled and self.run_block(pointer):
+                continue
+            instruction = decoded.get(pointer)
+            if (instruction is None
+                    or instruction[4] != self.memory[pointer]):
+                instruction = self.decode(pointer)
+            opcode, _, op, fetch, _ = instruction
+            if opcode == 99:  # halt
+                return
+            elif opcode == 3:  # input
+                while not self.inputs:
+                    if guard is not None:
+                        guard.pause()
+                    sent = yield None
+                    if guard is not None:
+                        guard.resume()
+                    if sent is not None:
+                        self.inputs.append(sent)
+            elif opcode == 4:  # output
+                value, = fetch(self.memory, pointer)
+                if self.log_output:
+                    print('PROGRAM OUTPUT: ', value)
+                self.pointer += self.num_params[4] + 1
+                if guard is not None:
+                    guard.steps += 1  # never a jump, so nothing to check
+                    guard.pause()
+                sent = yield value
+                if guard is not None:
+                    guard.resume()
+                if sent is not None:
+                    self.inputs.append(sent)
+                continue
+            if guard is None:
+                op(*fetch(self.memory, pointer))
+            else:
+                guard.step(self, pointer, opcode, op,
+                           fetch(self.memory, pointer))
+
+    async def execute_async(
+            self,
+            inputs: asyncio.Queue[int]) -> AsyncIterator[int]:
+        '''
+        Run the program as an async generator, yielding each output value.
+        When an input is needed and none are queued, await the next value
+        from the inputs channel.
+        '''
+        machine = self.execute()
+        sent: Optional[int] = None
+        while True:
+            try:
+                value = machine.send(sent)
+            except StopIteration:
+                return
+            if value is None:
+                sent = await inputs.get()
+            else:
+                sent = None
+                yield value
 
 
 if __name__ == '__main__':
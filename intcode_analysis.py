@@ -0,0 +1,267 @@
+from __future__ import annotations
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from intcode import Computer, Intcodes
+
+
+NAMES: Dict[int, str] = {  # opcode -> mnemonic
+    1: 'add',
+    2: 'mul',
+    3: 'inp',
+    4: 'out',
+    5: 'jit',
+    6: 'jif',
+    7: 'clt',
+    8: 'ceq',
+    99: 'halt',
+}
+
+JUMPS: Set[int] = {5, 6}
+
+
+class Instruction(NamedTuple):
+    address: int
+    opcode: int
+    modes: Tuple[int, ...]
+    params: Tuple[int, ...]
+
+    @property
+    def size(self) -> int:
+        return len(self.params) + 1
+
+    @property
+    def destination(self) -> Optional[int]:
+        '''
+        The address this instruction stores to, if any.
+        '''
+        return self.params[-1] if self.opcode in Computer.stores else None
+
+    def __str__(self) -> str:
+        operands = [f'[{p}]' if mode == 0 else str(p)
+                    for mode, p in zip(self.modes, self.params)]
+        if self.opcode in Computer.stores:
+            operands[-1] = f'-> [{self.params[-1]}]'
+        name = NAMES[self.opcode]
+        return f'{self.address:>6}: {name:<4} {" ".join(operands)}'
+
+
+class Block(NamedTuple):
+    start: int
+    end: int  # first address after the block
+    instructions: Tuple[Instruction, ...]
+    successors: Tuple[int, ...]  # start addresses of the following blocks
+    dynamic: bool  # ends in a jump whose target is only known at runtime
+
+
+class Analysis(NamedTuple):
+    instructions: Dict[int, Instruction]  # reachable code, by address
+    blocks: Dict[int, Block]  # by start address
+    loops: List[Tuple[int, int]]  # back edges, (block start, loop head)
+    code_writes: Dict[int, int]  # store address -> code address written
+    dynamic_jumps: List[int]  # addresses of jumps with unknown targets
+
+    @property
+    def self_modifying(self) -> bool:
+        return bool(self.code_writes)
+
+    @property
+    def static(self) -> bool:
+        '''
+        True if the code is never modified and every jump target is known,
+        so every block can stay compiled for the whole run.
+        '''
+        return not self.code_writes and not self.dynamic_jumps
+
+    def format(self) -> str:
+        '''
+        Return a listing of the blocks, their instructions and successors.
+        '''
+        lines: List[str] = []
+        for block in self.blocks.values():
+            lines.append(f'block {block.start}-{block.end - 1}:')
+            for instruction in block.instructions:
+                note = ''
+                if instruction.address in self.code_writes:
+                    note = '  ; writes code'
+                lines.append(f'{instruction}{note}')
+            targets = ', '.join(str(s) for s in block.successors)
+            if block.dynamic:
+                targets = ', '.join(filter(None, [targets, '?']))
+            lines.append(f'    -> {targets or "exit"}')
+        return '\n'.join(lines)
+
+
+def decode(program: Intcodes, address: int) -> Optional[Instruction]:
+    '''
+    Decode the instruction at address, using the Computer's mode decoding.
+    Return None if it is not a valid instruction.
+    '''
+    try:
+        opcode, *modes = Computer.parse_opvalue(program[address])
+    except (KeyError, ValueError):
+        return None
+    size = Computer.num_params[opcode] + 1
+    if address + size > len(program):
+        return None
+    params = tuple(program[address + 1:address + size])
+    return Instruction(address, opcode, tuple(modes), params)
+
+
+def disassemble(program: Intcodes) -> List[Instruction]:
+    '''
+    Decode the program by linear sweep from address 0, skipping single
+    words that are not valid instructions.
+    '''
+    instructions = []
+    address = 0
+    while address < len(program):
+        instruction = decode(program, address)
+        if instruction is None:
+            address += 1
+            continue
+        instructions.append(instruction)
+        address += instruction.size
+    return instructions
+
+
+def write_targets(instructions: Iterable[Instruction]) -> Set[int]:
+    return {x.destination for x in instructions if x.destination is not None}
+
+
+def jump_target(
+        program: Intcodes,
+        instruction: Instruction,
+        written: Set[int]) -> Optional[int]:
+    '''
+    Return the target of a jump if it is known before running the program.
+    '''
+    param = instruction.params[1]
+    if instruction.modes[1] == 1:
+        return None if instruction.address + 2 in written else param
+    if instruction.address + 2 in written or param in written:
+        return None
+    return program[param] if 0 <= param < len(program) else None
+
+
+def reachable(
+        program: Intcodes,
+        entries: Iterable[int]) -> Tuple[Dict[int, Instruction], Set[int]]:
+    '''
+    Decode every instruction reachable from the entry points by falling
+    through or taking a jump with a static target. Also return the reached
+    addresses that do not hold a valid instruction before the program runs.
+    '''
+    instructions: Dict[int, Instruction] = {}
+    invalid: Set[int] = set()
+    pending = list(entries)
+    while True:
+        while pending:
+            address = pending.pop()
+            if address in instructions or address in invalid:
+                continue
+            instruction = decode(program, address)
+            if instruction is None:
+                if 0 <= address < len(program):
+                    invalid.add(address)
+                continue
+            instructions[address] = instruction
+            if instruction.opcode != 99:
+                pending.append(address + instruction.size)
+        # Writes can make jump targets dynamic, so resolve them only once
+        # every store is known, and repeat for any newly reached code.
+        written = write_targets(instructions.values())
+        for instruction in list(instructions.values()):
+            if instruction.opcode in JUMPS:
+                target = jump_target(program, instruction, written)
+                if target is not None and target not in instructions:
+                    pending.append(target)
+        if not pending:
+            return instructions, invalid
+
+
+def analyze(program: Intcodes, entries: Iterable[int] = (0,)) -> Analysis:
+    '''
+    Build the control-flow graph of the code reachable from the entry
+    points: basic blocks, their successors, loops (back edges found by a
+    depth-first search from the first entry), stores that write into code,
+    and jumps whose targets depend on runtime data.
+    '''
+    entries = list(entries)
+    instructions, invalid = reachable(program, entries)
+    written = write_targets(instructions.values())
+    # Invalid words that are written to are patched into code at runtime.
+    patched = invalid & written
+    code = patched | {a for x in instructions.values()
+                      for a in range(x.address, x.address + x.size)}
+    code_writes = {x.address: x.destination for x in instructions.values()
+                   if x.destination in code}
+
+    targets: Dict[int, Optional[int]] = {
+        x.address: jump_target(program, x, written)
+        for x in instructions.values() if x.opcode in JUMPS}
+    leaders = set(entries) & set(instructions)
+    leaders |= {t for t in targets.values() if t in instructions}
+    leaders |= {a + instructions[a].size for a in targets
+                if a + instructions[a].size in instructions}
+
+    blocks: Dict[int, Block] = {}
+    for start in sorted(leaders):
+        body = []
+        address = start
+        while True:
+            instruction = instructions[address]
+            body.append(instruction)
+            address += instruction.size
+            if (instruction.opcode in JUMPS or instruction.opcode == 99
+                    or address in leaders or address not in instructions):
+                break
+        last = body[-1]
+        successors: List[int] = []
+        if last.opcode in JUMPS:
+            target = targets[last.address]
+            if target in instructions:
+                successors.append(target)  # type: ignore
+        if last.opcode != 99 and address in instructions:
+            successors.append(address)
+        dynamic = ((last.opcode in JUMPS and targets[last.address] is None)
+                   or address in patched)
+        blocks[start] = Block(start, address, tuple(body),
+                              tuple(dict.fromkeys(successors)), dynamic)
+
+    return Analysis(instructions,
+                    blocks,
+                    back_edges(blocks, entries[0]) if entries[0] in blocks
+                    else [],
+                    code_writes,
+                    sorted(a for a, t in targets.items() if t is None))
+
+
+def back_edges(blocks: Dict[int, Block], entry: int) -> List[Tuple[int, int]]:
+    '''
+    Find the edges that return to a block still on the depth-first search
+    stack. Each one closes a loop.
+    '''
+    edges: List[Tuple[int, int]] = []
+    visited: Set[int] = set()
+    on_stack: Set[int] = set()
+    stack = [(entry, iter(blocks[entry].successors))]
+    visited.add(entry)
+    on_stack.add(entry)
+    while stack:
+        start, successors = stack[-1]
+        for successor in successors:
+            if successor in on_stack:
+                edges.append((start, successor))
+            elif successor not in visited:
+                visited.add(successor)
+                on_stack.add(successor)
+                stack.append((successor, iter(blocks[successor].successors)))
+                break
+        else:
+            stack.pop()
+            on_stack.discard(start)
+    return sorted(edges)
+
+
+if __name__ == '__main__':
+    print(analyze(Computer.parse_file('input_day05.txt')).format())
@@ -0,0 +1,209 @@
+from __future__ import annotations
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from intcode import Computer, Intcodes
+from intcode_io import DequeChannel
+
+
+# Largest magnitude an add or multiply result may reach in int64 before the
+# instance is handed to the arbitrary-precision scalar interpreter.
+SAFE: float = 2.0 ** 62
+
+
+class BatchComputer:
+    '''
+    Run many instances of one intcode program in lockstep. Memories are the
+    rows of a 2-D int64 array. Instances at the same pointer with the same
+    instruction there execute it together as NumPy operations; instances
+    whose pointers diverge form separate groups. Small groups, and any
+    instance that needs something the batch cannot do (a missing input, an
+    out-of-range address, a result too big for int64), are peeled off onto
+    scalar Computers and finished there. With checkpoint, every instance
+    starts from the program's first input point, computed once by a scalar
+    Computer, since the instructions before it are the same for all. Only
+    use it if memory is not changed before running.
+    '''
+
+    def __init__(
+            self,
+            program: Intcodes,
+            size: int,
+            min_group: int = 4,
+            checkpoint: bool = False) -> None:
+        self.program: Intcodes = program
+        start: Intcodes = program
+        pointer = 0
+        outputs: Tuple[int, ...] = ()
+        point = Computer.input_point(program) if checkpoint else None
+        if point is not None and fits_int64(point.memory):
+            start, pointer, outputs = (list(point.memory), point.pointer,
+                                       point.outputs)
+        self.memory: np.ndarray = np.tile(np.array(start, dtype=np.int64),
+                                          (size, 1))
+        self.min_group: int = min_group
+        self.pointers: np.ndarray = np.full(size, pointer, dtype=np.int64)
+        self.inputs: Dict[int, Deque[int]] = {}  # instance -> inputs
+        self.outputs: List[List[int]] = [list(outputs) for _ in range(size)]
+        self.peeled: Dict[int, Computer] = {}  # instance -> scalar computer
+
+    def __len__(self) -> int:
+        return len(self.memory)
+
+    def set_inputs(self, inputs: Sequence[Sequence[int]]) -> None:
+        '''
+        Queue a list of inputs for each instance.
+        '''
+        self.inputs = {i: deque(x) for i, x in enumerate(inputs) if x}
+
+    def final_memory(self, index: int) -> Intcodes:
+        '''
+        Return the memory of one instance as a list.
+        '''
+        if index in self.peeled:
+            return list(self.peeled[index].memory)
+        return self.memory[index].tolist()
+
+    def values_at(self, address: int) -> List[int]:
+        '''
+        Return the value at an address in every instance's memory.
+        '''
+        values = self.memory[:, address].tolist()
+        for index, computer in self.peeled.items():
+            values[index] = computer.memory[address]
+        return values
+
+    def run(self) -> List[List[int]]:
+        '''
+        Run every instance until it halts. Return the outputs of each one.
+        '''
+        groups: Dict[int, np.ndarray] = {}  # pointer -> instances
+        for pointer in np.unique(self.pointers).tolist():
+            groups[pointer] = np.flatnonzero(self.pointers == pointer)
+        while groups:
+            pointer = max(groups, key=lambda p: len(groups[p]))
+            instances = groups.pop(pointer)
+            if (len(instances) < self.min_group
+                    or not 0 <= pointer < self.memory.shape[1]):
+                self.peel(instances, pointer)
+                continue
+            opvalues = self.memory[instances, pointer]
+            for opvalue in np.unique(opvalues).tolist():
+                same = instances[opvalues == opvalue]
+                for next_pointer, group in self.step(same, pointer, opvalue):
+                    if next_pointer in groups:
+                        group = np.concatenate([groups[next_pointer], group])
+                    groups[next_pointer] = group
+        return self.outputs
+
+    def step(
+            self,
+            instances: np.ndarray,
+            pointer: int,
+            opvalue: int) -> List[Tuple[int, np.ndarray]]:
+        '''
+        Execute one instruction for a group of instances. Return a list of
+        (next pointer, instances) pairs for those still running in the batch.
+        '''
+        memory = self.memory
+        try:
+            opcode, *modes = Computer.parse_opvalue(opvalue)
+        except (KeyError, ValueError):
+            self.peel(instances, pointer)
+            return []
+        if opcode == 99:  # halt
+            self.pointers[instances] = pointer
+            return []
+        size = len(modes) + 1
+        if pointer + size > memory.shape[1]:
+            self.peel(instances, pointer)
+            return []
+        params = memory[instances, pointer + 1:pointer + size]
+        addresses = [k for k, mode in enumerate(modes) if mode == 0]
+        if opcode not in (4, 5, 6):  # destination is an address too
+            addresses.append(len(modes) - 1)
+        ok = np.ones(len(instances), dtype=bool)
+        for k in addresses:
+            ok &= (params[:, k] >= 0) & (params[:, k] < memory.shape[1])
+        if opcode == 3:
+            ok &= np.array([bool(self.inputs.get(i)) for i in instances],
+                           dtype=bool)
+        instances, params = self.keep(instances, params, ok, pointer)
+        values = [memory[instances, params[:, k]] if mode == 0
+                  else params[:, k] for k, mode in enumerate(modes)]
+
+        if opcode in (1, 2):  # add, multiply
+            a, b = (np.abs(x.astype(np.float64)) for x in values[:2])
+            ok = (a + b < SAFE) if opcode == 1 else (a * b < SAFE)
+            instances, params = self.keep(instances, params, ok, pointer)
+            a, b = values[0][ok], values[1][ok]
+            memory[instances, params[:, 2]] = a + b if opcode == 1 else a * b
+        elif opcode in (7, 8):  # less than, equals
+            a, b = values[:2]
+            result = a < b if opcode == 7 else a == b
+            memory[instances, params[:, 2]] = result.astype(np.int64)
+        elif opcode == 3:  # input
+            memory[instances, params[:, 0]] = [self.inputs[i].popleft()
+                                               for i in instances.tolist()]
+        elif opcode == 4:  # output
+            for i, value in zip(instances.tolist(), values[0].tolist()):
+                self.outputs[i].append(value)
+        elif opcode in (5, 6):  # jump-if-true, jump-if-false
+            a, b = values
+            jump = a != 0 if opcode == 5 else a == 0
+            targets = np.where(jump, b, pointer + size)
+            return [(target, instances[targets == target])
+                    for target in np.unique(targets).tolist()]
+        if len(instances) == 0:
+            return []
+        return [(pointer + size, instances)]
+
+    def keep(
+            self,
+            instances: np.ndarray,
+            params: np.ndarray,
+            ok: np.ndarray,
+            pointer: int) -> Tuple[np.ndarray, np.ndarray]:
+        '''
+        Peel off the instances that are not ok and return the rest with
+        their parameters.
+        '''
+        if ok.all():
+            return instances, params
+        self.peel(instances[~ok], pointer)
+        return instances[ok], params[ok]
+
+    def peel(self, instances: np.ndarray, pointer: int) -> None:
+        '''
+        Move instances onto scalar Computers and run them to completion.
+        A missing input raises EOFError instead of prompting.
+        '''
+        for i in instances.tolist():
+            computer = Computer(self.program, input_channel=DequeChannel())
+            computer.memory = self.memory[i].tolist()
+            computer.pointer = pointer
+            computer.inputs = self.inputs.setdefault(i, deque())
+            computer.outputs = self.outputs[i]
+            self.peeled[i] = computer
+            self.pointers[i] = pointer
+            computer.run()
+            self.pointers[i] = computer.pointer
+
+
+def fits_int64(values: Iterable[int]) -> bool:
+    return all(-2 ** 63 <= value < 2 ** 63 for value in values)
+
+
+def run_batch(
+        program: Intcodes,
+        inputs: Sequence[Sequence[int]],
+        min_group: int = 4) -> List[List[int]]:
+    '''
+    Run the program once per list of inputs and return the outputs of each
+    run. The runs start from the program's first input point.
+    '''
+    batch = BatchComputer(program, len(inputs), min_group, checkpoint=True)
+    batch.set_inputs(inputs)
+    return batch.run()
@@ -0,0 +1,123 @@
+from __future__ import annotations
+from typing import (TYPE_CHECKING, Any, Callable, Dict, FrozenSet, List,
+                    NamedTuple, Optional, Sequence, Set, Tuple)
+
+from intcode_memory import PAGE_BITS
+
+if TYPE_CHECKING:
+    from intcode import Computer
+
+
+class Block(NamedTuple):
+    start: int  # address of the first instruction
+    end: int  # first address after the last instruction
+    writes: FrozenSet[int]  # addresses the block stores to
+    pages: FrozenSet[int]  # memory pages of those addresses
+    addresses: Tuple[int, ...]  # address of the instruction on each line
+    code: List[int]  # memory from start to end when it was compiled
+    function: Callable  # (memory) -> next pointer, or None if code changed
+    source: str
+
+
+# Templates shared with the peephole pass, which fuses instructions the
+# same way. In generated code, m is memory.
+EXPRESSIONS: Dict[int, str] = {  # opcode -> value stored
+    1: '{a} + {b}',
+    2: '{a} * {b}',
+    7: '1 if {a} < {b} else 0',
+    8: '1 if {a} == {b} else 0',
+}
+
+CONDITIONS: Dict[int, str] = {  # opcode -> condition for taking the jump
+    5: '{a} != 0',
+    6: '{a} == 0',
+}
+
+
+def operand(memory: Sequence[int], address: int, mode: int) -> str:
+    '''
+    Return the Python expression for a parameter stored at the given address.
+    '''
+    if mode == 0:  # position mode
+        return f'm[{memory[address]}]'
+    return str(memory[address])  # immediate mode
+
+
+def jump_target(lines: List[str], target: str) -> str:
+    '''
+    Return the expression for a jump's target. A target in memory is read
+    into a local by a line added to lines first, because the interpreter
+    fetches it even when the jump is not taken, so a bad address must fail
+    in generated code too.
+    '''
+    if target.startswith('m['):
+        lines.append(f'target = {target}')
+        return 'target'
+    return target
+
+
+def code_changed(start: int, end: int) -> str:
+    '''
+    Return the condition that memory from start to end no longer holds the
+    list called code. Flat backends other than list give slices of their
+    own type, which never equal a list, so those are compared as lists.
+    '''
+    return f'm[{start}:{end}] != code and list(m[{start}:{end}]) != code'
+
+
+def compile_block(computer: Computer, start: int) -> Optional[Block]:
+    '''
+    Compile the straight-line code beginning at start into a Python function.
+    The block ends after a jump, before an input, output, halt or unknown
+    opcode, and before any instruction that overlaps an address written
+    earlier in the block. Return None if there is nothing to compile, or if
+    the code has been modified at runtime and should be interpreted instead.
+    The function first checks that memory still holds the code it was
+    compiled from, and returns None without running it if not.
+    '''
+    memory = computer.memory
+    original = computer.original_program
+    lines: List[str] = []
+    addresses: List[int] = []
+    writes: Set[int] = set()
+    address = start
+    while address < len(memory):
+        try:
+            opcode, *modes = computer.parse_opvalue(memory[address])
+        except (KeyError, ValueError):
+            break
+        size = computer.num_params[opcode] + 1
+        if (opcode not in EXPRESSIONS and opcode not in CONDITIONS
+                or address + size > len(memory)
+                or not writes.isdisjoint(range(address, address + size))):
+            break
+        a = operand(memory, address + 1, modes[0])
+        b = operand(memory, address + 2, modes[1])
+        addresses.append(address)
+        if opcode in CONDITIONS:
+            b = jump_target(lines, b)
+            condition = CONDITIONS[opcode].format(a=a)
+            lines.append(f'return {b} if {condition} else {address + size}')
+            address += size
+            break
+        c = memory[address + 3]
+        lines.append(f'm[{c}] = ' + EXPRESSIONS[opcode].format(a=a, b=b))
+        writes.add(c)
+        address += size
+    if not lines or list(memory[start:address]) != original[start:address]:
+        return None
+    if not lines[-1].startswith('return'):
+        lines.append(f'return {address}')
+    code = list(memory[start:address])
+    lines.insert(0, f'if {code_changed(start, address)}: return None')
+    source = 'def block(m):\n' + ''.join(f'    {x}\n' for x in lines)
+    namespace: Dict[str, Any] = {'code': code}
+    exec(compile(source, f'<intcode block {start}>', 'exec'), namespace)
+    return Block(start,
+                 address,
+                 frozenset(writes),
+                 frozenset(address >> PAGE_BITS for address in writes),
+                 tuple(addresses),
+                 code,
+                 namespace['block'],
+                 source)
@@ -0,0 +1,123 @@
+from __future__ import annotations
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Dict, List, Tuple
+
+# Binary intcode program:
+#   header    MAGIC, value count and overflow count, as '<4sQQ'
+#   values    one little-endian int64 per value, 0 where it overflows
+#   overflow  for each value that does not fit in int64: its index and the
+#             length of its decimal text, as '<QI', then the text
+MAGIC: bytes = b'ICB1'
+HEADER = struct.Struct('<4sQQ')
+OVERFLOW = struct.Struct('<QI')
+INT64_MIN: int = -1 << 63
+INT64_MAX: int = (1 << 63) - 1
+
+Intcodes = List[int]
+
+# path -> (mtime in ns, size in bytes, program)
+cache: Dict[str, Tuple[int, int, Tuple[int, ...]]] = {}
+
+
+def dumps(program: Intcodes) -> bytes:
+    '''
+    Encode a program in the binary format.
+    '''
+    overflow: List[Tuple[int, bytes]] = []
+    packed = array('q', bytes(8 * len(program)))
+    for index, value in enumerate(program):
+        if INT64_MIN <= value <= INT64_MAX:
+            packed[index] = value
+        else:
+            overflow.append((index, str(value).encode()))
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    parts = [HEADER.pack(MAGIC, len(program), len(overflow)),
+             packed.tobytes()]
+    for index, text in overflow:
+        parts.append(OVERFLOW.pack(index, len(text)))
+        parts.append(text)
+    return b''.join(parts)
+
+
+def loads(data: bytes) -> Intcodes:
+    '''
+    Decode a program from the binary format. data may be any buffer, such
+    as an mmap.
+    '''
+    if len(data) < HEADER.size:
+        raise ValueError('Truncated intcode binary header.')
+    magic, count, overflows = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f'Not an intcode binary: magic {magic!r}.')
+    end = HEADER.size + 8 * count
+    if len(data) < end:
+        raise ValueError('Truncated intcode binary values.')
+    packed = array('q')
+    packed.frombytes(memoryview(data)[HEADER.size:end])
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    program = packed.tolist()
+    offset = end
+    for _ in range(overflows):
+        index, length = OVERFLOW.unpack_from(data, offset)
+        offset += OVERFLOW.size
+        program[index] = int(bytes(data[offset:offset + length]))
+        offset += length
+    return program
+
+
+def is_binary(filename: str) -> bool:
+    with open(filename, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def load_binary(filename: str) -> Intcodes:
+    '''
+    Load a binary program by mapping the file into memory, so the values
+    are unpacked straight from the page cache.
+    '''
+    with open(filename, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError(f'{filename} is empty.')
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return loads(mapped)
+
+
+def load_text(filename: str) -> Intcodes:
+    with open(filename) as f:
+        return [int(x) for x in f.read().split(',')]
+
+
+def load(filename: str) -> Intcodes:
+    '''
+    Load a text or binary program, parsing each file only once per process
+    while its modification time and size are unchanged. Every call returns
+    a new list, so callers may modify it.
+    '''
+    path = os.path.abspath(filename)
+    stat = os.stat(path)
+    entry = cache.get(path)
+    if entry is None or entry[:2] != (stat.st_mtime_ns, stat.st_size):
+        program = load_binary(path) if is_binary(path) else load_text(path)
+        entry = cache[path] = (stat.st_mtime_ns, stat.st_size, tuple(program))
+    return list(entry[2])
+
+
+def convert(source: str, destination: str) -> None:
+    '''
+    Write the program in a text or binary file to a binary file.
+    '''
+    program = load(source)
+    with open(destination, 'wb') as f:
+        f.write(dumps(program))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        sys.exit(f'usage: {sys.argv[0]} PROGRAM.txt PROGRAM.icb')
+    convert(sys.argv[1], sys.argv[2])
@@ -0,0 +1,314 @@
+from __future__ import annotations
+import random
+import sys
+from time import perf_counter
+from typing import (Callable, Dict, FrozenSet, Iterable, List, NamedTuple,
+                    Optional, Sequence, Tuple)
+
+import day02
+import day05
+from intcode import Computer, Intcodes
+from intcode_guard import Limits
+from intcode_io import DequeChannel
+
+# (program, inputs) -> (final memory, outputs)
+Runner = Callable[[Intcodes, List[int]], Tuple[Intcodes, List[int]]]
+
+ALL_OPCODES: FrozenSet[int] = frozenset(Computer.num_params)
+JUMPS = (5, 6)
+DATA_SIZE: int = 8  # data values after the code
+CONSTANTS: int = 3  # data values at the start that are never written
+
+
+class Engine(NamedTuple):
+    run: Runner
+    opcodes: FrozenSet[int]  # opcodes it can execute
+    modes: bool  # whether it supports immediate mode
+
+
+class Mismatch(AssertionError):
+    '''
+    Raised when engines disagree about a program. results maps each engine
+    to its final memory and outputs.
+    '''
+
+    def __init__(
+            self,
+            program: Intcodes,
+            inputs: List[int],
+            results: Dict[str, Tuple[Intcodes, List[int]]]) -> None:
+        self.program: Intcodes = program
+        self.inputs: List[int] = inputs
+        self.results: Dict[str, Tuple[Intcodes, List[int]]] = results
+        groups: Dict[str, List[str]] = {}
+        for name, result in results.items():
+            groups.setdefault(repr(result), []).append(name)
+        super().__init__('engines disagree: ' +
+                         ' vs '.join(','.join(names)
+                                     for names in groups.values()) +
+                         f' on program {program} with inputs {inputs}')
+
+
+ENGINES: Dict[str, Engine] = {}  # name -> engine
+
+
+def register(
+        name: str,
+        run: Runner,
+        opcodes: Iterable[int] = ALL_OPCODES,
+        modes: bool = True) -> None:
+    '''
+    Add an engine for the fuzzer and benchmark to run. run takes a program
+    and a list of inputs and returns the final memory and the outputs; it
+    must not change the program.
+    '''
+    ENGINES[name] = Engine(run, frozenset(opcodes), modes)
+
+
+def run_day02(program: Intcodes, inputs: List[int]) -> Tuple[Intcodes,
+                                                             List[int]]:
+    return day02.step(list(program)), []
+
+
+def run_day05(program: Intcodes, inputs: List[int]) -> Tuple[Intcodes,
+                                                             List[int]]:
+    memory, _ = day05.step([str(x) for x in program])
+    return [int(x) for x in memory], []
+
+
+def computer_runner(**options: object) -> Runner:
+    '''
+    Return a runner for intcode Computers made with the given options.
+    '''
+    def run(program: Intcodes, inputs: List[int]) -> Tuple[Intcodes,
+                                                           List[int]]:
+        computer = Computer(program,
+                            input_channel=DequeChannel(),
+                            **options)  # type: ignore
+        outputs = computer.run(with_inputs=list(inputs))
+        return list(computer.memory), list(outputs)
+    return run
+
+
+def run_batch(program: Intcodes, inputs: List[int]) -> Tuple[Intcodes,
+                                                             List[int]]:
+    from intcode_batch import BatchComputer
+    batch = BatchComputer(program, 4)  # a full group, so it stays batched
+    batch.set_inputs([inputs] * len(batch))
+    outputs = batch.run()
+    return batch.final_memory(0), outputs[0]
+
+
+register('day02', run_day02, opcodes=(1, 2, 99), modes=False)
+register('day05', run_day05, opcodes=ALL_OPCODES - {3, 4})
+register('interpreter', computer_runner())
+register('compiled', computer_runner(engine='compiled'))
+register('peephole', computer_runner(peephole=True))
+register('paged', computer_runner(backend='paged'))
+register('array', computer_runner(backend='array'))
+register('guarded', computer_runner(limits=Limits(max_steps=10 ** 7,
+                                                  cycles=True)))
+try:
+    import numpy  # noqa: F401
+except ImportError:
+    pass
+else:
+    register('batch', run_batch)
+
+
+def shared(names: Sequence[str]) -> Tuple[FrozenSet[int], bool]:
+    '''
+    Return the opcodes all the named engines can execute, and whether they
+    all support immediate mode.
+    '''
+    engines = [ENGINES[name] for name in names]
+    opcodes = frozenset.intersection(*(e.opcodes for e in engines))
+    return opcodes, all(e.modes for e in engines)
+
+
+def random_program(
+        rng: random.Random,
+        opcodes: Iterable[int] = ALL_OPCODES,
+        modes: bool = True,
+        length: int = 20,
+        iterations: int = 1,
+        self_modify: bool = True) -> Tuple[Intcodes, List[int]]:
+    '''
+    Generate a program of length random instructions, followed by a halt
+    and DATA_SIZE data values, that always halts. Return it and enough
+    inputs for every input instruction it may run. Jumps only go forward
+    and stores only go to the data, so the program stays valid; without
+    modes there are no jumps, as their targets are immediate. With
+    iterations > 1, the instructions run in a loop that many times, counted
+    down in a data value nothing else writes to. With self_modify, stores
+    may also overwrite immediate operands in the code. Multiplications take
+    one factor from the constants, or an immediate, so values grow by at
+    most one digit per multiplication and never get too big to print.
+    '''
+    body = sorted(set(opcodes) - {99} - (set() if modes else set(JUMPS)))
+    if not body:
+        raise ValueError('No opcodes to generate a program from.')
+    looped = iterations > 1
+    if looped and not (modes and 1 in opcodes and 5 in opcodes):
+        raise ValueError('Loops need immediate mode and opcodes 1 and 5.')
+    kinds = [rng.choice(body) for _ in range(length)]
+    starts = [0]
+    for opcode in kinds:
+        starts.append(starts[-1] + Computer.num_params[opcode] + 1)
+    tail = [1001, 0, -1, 0, 1005, 0, 0] if looped else []
+    halt = starts[-1] + len(tail)
+    data = halt + 1
+    size = data + DATA_SIZE
+    constants = list(range(data, data + CONSTANTS))
+    counter = data + CONSTANTS if looped else None
+    cells = [x for x in range(data + CONSTANTS, size) if x != counter]
+
+    code: Intcodes = []
+    patchable: List[int] = []  # addresses of immediate operands
+    destinations: List[int] = []  # addresses holding a store's destination
+    inputs = 0
+    for index, opcode in enumerate(kinds):
+        address = starts[index]
+        operands: List[int] = []
+        digits: List[int] = []
+        params = Computer.num_params[opcode]
+        for k in range(params):
+            if opcode in Computer.stores and k == params - 1:
+                destinations.append(address + 1 + k)
+                operands.append(0)  # filled in below
+                digits.append(0)
+            elif opcode in JUMPS and k == 1:
+                operands.append(rng.choice(starts[index + 1:] + [halt]))
+                digits.append(1)
+            elif opcode == 2 and k == 1:  # not patchable, so it stays small
+                if modes and rng.random() < 0.5:
+                    operands.append(rng.randint(-9, 9))
+                    digits.append(1)
+                else:
+                    operands.append(rng.choice(constants))
+                    digits.append(0)
+            elif modes and rng.random() < 0.5:
+                patchable.append(address + 1 + k)
+                operands.append(rng.randint(-9, 9))
+                digits.append(1)
+            else:
+                operands.append(rng.randrange(size))
+                digits.append(0)
+        if opcode == 3:
+            inputs += 1
+        opvalue = opcode + sum(d * 10 ** (k + 2) for k, d in enumerate(digits))
+        code += [opvalue, *operands]
+    for address in destinations:
+        if self_modify and patchable and rng.random() < 0.2:
+            code[address] = rng.choice(patchable)
+        else:
+            code[address] = rng.choice(cells)
+    if looped:
+        tail[1] = tail[3] = tail[5] = counter  # type: ignore
+    values = [rng.randint(-9, 9) for _ in range(DATA_SIZE)]
+    if looped:
+        values[CONSTANTS] = iterations
+    program = code + tail + [99] + values
+    rng_inputs = [rng.randint(-9, 9) for _ in range(inputs * iterations)]
+    return program, rng_inputs
+
+
+def check(
+        program: Intcodes,
+        inputs: List[int],
+        names: Optional[Sequence[str]] = None) -> Tuple[Intcodes, List[int]]:
+    '''
+    Run a program on every named engine, all by default, and return the
+    final memory and outputs they agree on. Raise Mismatch if they differ.
+    '''
+    names = list(ENGINES) if names is None else names
+    results = {name: ENGINES[name].run(program, inputs) for name in names}
+    first = results[names[0]]
+    if any(result != first for result in results.values()):
+        raise Mismatch(program, inputs, results)
+    return first
+
+
+def fuzz(
+        count: int = 1000,
+        seed: int = 0,
+        names: Optional[Sequence[str]] = None,
+        length: int = 20,
+        iterations: int = 1) -> int:
+    '''
+    Check count random programs, using only the opcodes and modes every
+    named engine supports. Return the number checked; raise Mismatch at
+    the first program the engines disagree about.
+    '''
+    names = list(ENGINES) if names is None else names
+    opcodes, modes = shared(names)
+    rng = random.Random(seed)
+    for _ in range(count):
+        program, inputs = random_program(rng, opcodes, modes, length,
+                                         iterations)
+        check(program, inputs, names)
+    return count
+
+
+def count_instructions(program: Intcodes, inputs: List[int]) -> int:
+    computer = Computer(program, input_channel=DequeChannel())
+    computer.set_inputs(list(inputs))
+    _, executed = computer.run_slice(sys.maxsize)
+    return executed
+
+
+def benchmark(
+        programs: Sequence[Tuple[Intcodes, List[int]]],
+        names: Optional[Sequence[str]] = None,
+        repeat: int = 3) -> Dict[str, float]:
+    '''
+    Run every (program, inputs) on each named engine, best of repeat, and
+    return the instructions per second of each engine, counting the time to
+    set up every run.
+    '''
+    names = list(ENGINES) if names is None else names
+    total = sum(count_instructions(*x) for x in programs)
+    speeds = {}
+    for name in names:
+        run = ENGINES[name].run
+        best = float('inf')
+        for _ in range(repeat):
+            start = perf_counter()
+            for program, inputs in programs:
+                run(program, inputs)
+            best = min(best, perf_counter() - start)
+        speeds[name] = total / best
+    return speeds
+
+
+def report(
+        names: Optional[Sequence[str]] = None,
+        count: int = 200,
+        seed: int = 0,
+        length: int = 50,
+        iterations: int = 1) -> List[str]:
+    '''
+    Fuzz the named engines with count programs, then benchmark them on the
+    same programs. Return a line per engine, fastest first.
+    '''
+    names = list(ENGINES) if names is None else names
+    opcodes, modes = shared(names)
+    rng = random.Random(seed)
+    programs = [random_program(rng, opcodes, modes, length, iterations)
+                for _ in range(count)]
+    for program, inputs in programs:
+        check(program, inputs, names)
+    speeds = benchmark(programs, names)
+    return [f'{name}: {speed / 1e6:.2f}M instructions/s'
+            for name, speed in sorted(speeds.items(), key=lambda x: -x[1])]
+
+
+if __name__ == '__main__':
+    print(f'All engines ({", ".join(ENGINES)}), opcodes 1, 2 and 99:')
+    print('\n'.join(report()))
+    computers = [name for name in ENGINES
+                 if name not in ('day02', 'day05', 'batch')]
+    print('\nWithout I/O, in loops:')
+    print('\n'.join(report([*computers, 'day05'], iterations=50)))
+    print('\nAll opcodes, in loops:')
+    print('\n'.join(report(computers, iterations=50)))
@@ -0,0 +1,199 @@
+from __future__ import annotations
+from time import perf_counter
+from typing import (TYPE_CHECKING, Callable, List, NamedTuple, Optional,
+                    Tuple)
+
+from intcode_memory import Memory
+
+if TYPE_CHECKING:
+    from intcode import Computer
+
+# Backward jumps between checks of a guarded run's limits.
+CHECK_INTERVAL: int = 16
+
+
+class Limits(NamedTuple):
+    max_steps: Optional[int] = None  # instructions per run
+    max_seconds: Optional[float] = None  # wall-clock time per run
+    cycles: bool = False  # stop when the machine state repeats
+
+
+class LoopError(RuntimeError):
+    '''
+    Raised when a guarded run is stopped. reason is 'cycle' if the machine
+    returned to an earlier state without reading an input, so it would
+    never halt, or 'steps' or 'time' if it hit a limit. loop is the address
+    range (first, last) of the loops that were running.
+    '''
+
+    def __init__(
+            self,
+            reason: str,
+            pointer: int,
+            steps: int,
+            elapsed: float,
+            loop: Tuple[int, int],
+            period: Optional[int] = None) -> None:
+        self.reason: str = reason
+        self.pointer: int = pointer
+        self.steps: int = steps
+        self.elapsed: float = elapsed
+        self.loop: Tuple[int, int] = loop
+        self.period: Optional[int] = period  # a multiple of the cycle length
+        detail = {
+            'cycle': f'state repeats every {period} steps',
+            'steps': 'step limit reached',
+            'time': 'time limit reached',
+        }[reason]
+        super().__init__(f'{detail} at {pointer} after {steps} steps, ' +
+                         f'{elapsed:.3f}s, looping in {loop[0]}-{loop[1]}')
+
+
+class CycleDetector:
+    '''
+    Detect a repeated machine state with Brent's algorithm, checked at
+    backward jumps. The state is the pointer and a hash of memory, which
+    the caller keeps as the XOR of hash((address, old)) and
+    hash((address, new)) over every store that changes a value. Comparing
+    states costs O(1); memory is only compared in full to confirm a match.
+    The caller may check only every n-th jump, and then finds a multiple of
+    the period. A copy of memory is saved each time the number of checks
+    reaches a power of two, so the copying costs amortized
+    O(size * log(checks)). A cycle is found within about twice its length
+    after it starts.
+    '''
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        '''
+        Forget the saved state, after an input makes the run depend on more
+        than its memory.
+        '''
+        self.saved: Optional[Tuple[int, int, List[int], int]] = None
+        self.power: int = 1
+        self.length: int = 0
+
+    def jump(
+            self,
+            pointer: int,
+            state_hash: int,
+            memory: Memory,
+            steps: int) -> Optional[int]:
+        '''
+        Check the state at pointer, with the given memory hash, after a
+        backward jump. Return the period in steps if it repeats the saved
+        state, 0 if this state was saved instead, or None.
+        '''
+        saved = self.saved
+        if (saved is not None and saved[0] == pointer
+                and saved[1] == state_hash and saved[2] == list(memory)):
+            return steps - saved[3]
+        self.length += 1
+        if self.length >= self.power:
+            self.saved = (pointer, state_hash, list(memory), steps)
+            self.power *= 2
+            self.length = 0
+            return 0
+        return None
+
+
+class Guard:
+    '''
+    The state of one guarded run, which executes its instructions through
+    step. Limits and the cycle detector are checked at every
+    CHECK_INTERVAL-th backward jump. Between two backward jumps the pointer
+    only moves forward, so any run that does not halt keeps reaching these
+    checks. A run may be paused, while it waits for input or between
+    slices, and its time only counts while it is not.
+    '''
+
+    def __init__(self, limits: Limits, pointer: int) -> None:
+        self.limits: Limits = limits
+        self.detector: Optional[CycleDetector] = (
+            CycleDetector() if limits.cycles else None)
+        self.memory_hash: int = 0  # see CycleDetector
+        self.steps: int = 0
+        self.jumps: int = 0
+        self.low: int = pointer  # range of the loops since the last check
+        self.high: int = -1
+        self.elapsed: float = 0.0  # time run before the last resume
+        self.resume()
+
+    def resume(self) -> None:
+        self.started: float = perf_counter()
+        self.deadline: Optional[float] = (
+            None if self.limits.max_seconds is None
+            else self.started + self.limits.max_seconds - self.elapsed)
+
+    def pause(self) -> None:
+        self.elapsed += perf_counter() - self.started
+
+    def step(
+            self,
+            computer: Computer,
+            pointer: int,
+            opcode: int,
+            op: Callable,
+            args: Tuple[int, ...]) -> Optional[int]:
+        '''
+        Execute the instruction at pointer with its handler and arguments,
+        and return its output. Raise LoopError if the run must stop.
+        '''
+        detector = self.detector
+        if detector is not None and opcode in computer.stores:
+            memory = computer.memory
+            address = args[-1]
+            old = memory[address]
+            output = op(*args)
+            new = computer.memory[address]
+            if new != old:
+                self.memory_hash ^= (hash((address, old)) ^
+                                     hash((address, new)))
+            if opcode == 3:
+                # The state now depends on an input, so no earlier state
+                # can repeat it.
+                detector.reset()
+        else:
+            output = op(*args)
+        self.steps += 1
+        if computer.pointer <= pointer:  # backward jump
+            self.jumped(computer, pointer)
+        return output
+
+    def jumped(self, computer: Computer, pointer: int) -> None:
+        '''
+        Record a backward jump from pointer, and check the limits and the
+        cycle detector if it is time to.
+        '''
+        if computer.pointer < self.low:
+            self.low = computer.pointer
+        if pointer > self.high:
+            self.high = pointer
+        self.jumps += 1
+        if self.jumps % CHECK_INTERVAL:
+            return
+        max_steps = self.limits.max_steps
+        if max_steps is not None and self.steps >= max_steps:
+            raise self.stop(computer, 'steps')
+        if self.deadline is not None and perf_counter() >= self.deadline:
+            raise self.stop(computer, 'time')
+        if self.detector is None:
+            self.low, self.high = computer.pointer, -1
+            return
+        period = self.detector.jump(computer.pointer, self.memory_hash,
+                                    computer.memory, self.steps)
+        if period == 0:  # saved this state
+            self.low, self.high = computer.pointer, -1
+        elif period is not None:
+            raise self.stop(computer, 'cycle', period)
+
+    def stop(
+            self,
+            computer: Computer,
+            reason: str,
+            period: Optional[int] = None) -> LoopError:
+        elapsed = self.elapsed + perf_counter() - self.started
+        return LoopError(reason, computer.pointer, self.steps, elapsed,
+                         (self.low, self.high + 2), period)
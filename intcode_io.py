@@ -0,0 +1,179 @@
+from __future__ import annotations
+import asyncio
+import io
+import os
+import queue
+from collections import deque
+from typing import Callable, Deque, Iterable, Optional, Tuple
+
+
+class Channel:
+    '''
+    A source and/or sink of intcode values. get() returns the next value,
+    blocking if the channel supports it, and raises EOFError when no value
+    will ever arrive. poll() returns the next value only if it is available
+    without waiting, otherwise None. put() sends a value.
+    '''
+
+    def get(self) -> int:
+        raise io.UnsupportedOperation(f'{type(self).__name__} is write-only')
+
+    def poll(self) -> Optional[int]:
+        return None
+
+    def put(self, value: int) -> None:
+        raise io.UnsupportedOperation(f'{type(self).__name__} is read-only')
+
+
+class ConsoleChannel(Channel):
+    '''
+    Ask the user for each value on stdin, and print values sent to it.
+    '''
+
+    def get(self) -> int:
+        while True:
+            user_input = input('Enter integer: ')
+            try:
+                return int(user_input)
+            except ValueError as e:
+                print(e)
+                print('Invalid input, try again.')
+
+    def put(self, value: int) -> None:
+        print('PROGRAM OUTPUT: ', value)
+
+
+class DequeChannel(Channel):
+    '''
+    An unbounded in-process buffer. Never blocks; get() raises EOFError when
+    it is empty.
+    '''
+
+    def __init__(self, values: Iterable[int] = ()) -> None:
+        self.values: Deque[int] = deque(values)
+
+    def get(self) -> int:
+        if not self.values:
+            raise EOFError('no input available')
+        return self.values.popleft()
+
+    def poll(self) -> Optional[int]:
+        return self.values.popleft() if self.values else None
+
+    def put(self, value: int) -> None:
+        self.values.append(value)
+
+
+class QueueChannel(Channel):
+    '''
+    A thread-safe buffer. With maxsize, put() blocks while it is full. get()
+    blocks until a value arrives, raising queue.Empty after timeout seconds
+    if a timeout is given.
+    '''
+
+    def __init__(
+            self,
+            maxsize: int = 0,
+            timeout: Optional[float] = None) -> None:
+        self.queue: queue.Queue[int] = queue.Queue(maxsize)
+        self.timeout: Optional[float] = timeout
+
+    def get(self) -> int:
+        return self.queue.get(timeout=self.timeout)
+
+    def poll(self) -> Optional[int]:
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            return None
+
+    def put(self, value: int) -> None:
+        self.queue.put(value, timeout=self.timeout)
+
+
+class AsyncQueueChannel(Channel):
+    '''
+    Connect a computer running in a worker thread to an asyncio.Queue owned
+    by an event loop in another thread. Calls block the worker, never the
+    loop, and must not be made from the loop's own thread.
+    '''
+
+    def __init__(
+            self,
+            async_queue: asyncio.Queue[int],
+            loop: asyncio.AbstractEventLoop) -> None:
+        self.queue: asyncio.Queue[int] = async_queue
+        self.loop: asyncio.AbstractEventLoop = loop
+
+    def get(self) -> int:
+        return asyncio.run_coroutine_threadsafe(self.queue.get(),
+                                                self.loop).result()
+
+    def put(self, value: int) -> None:
+        asyncio.run_coroutine_threadsafe(self.queue.put(value),
+                                         self.loop).result()
+
+
+class PipeChannel(Channel):
+    '''
+    Values as decimal lines on OS pipe file descriptors, for computers in
+    different processes. Writes block while the pipe buffer is full, and
+    get() raises EOFError once the write end is closed.
+    '''
+
+    def __init__(
+            self,
+            read_fd: Optional[int] = None,
+            write_fd: Optional[int] = None) -> None:
+        self.reader = None if read_fd is None else os.fdopen(read_fd, 'r')
+        self.writer = (None if write_fd is None
+                       else os.fdopen(write_fd, 'w', buffering=1))
+
+    @classmethod
+    def pipe(cls) -> Tuple[PipeChannel, PipeChannel]:
+        '''
+        Create an OS pipe and return its (read end, write end) channels.
+        '''
+        read_fd, write_fd = os.pipe()
+        return cls(read_fd=read_fd), cls(write_fd=write_fd)
+
+    def get(self) -> int:
+        if self.reader is None:
+            return super().get()
+        line = self.reader.readline()
+        if not line:
+            raise EOFError('pipe closed')
+        return int(line)
+
+    def put(self, value: int) -> None:
+        if self.writer is None:
+            return super().put(value)
+        self.writer.write(f'{value}\n')
+
+    def close(self) -> None:
+        for f in (self.reader, self.writer):
+            if f is not None:
+                f.close()
+
+
+class CallbackChannel(Channel):
+    '''
+    Get values from one function and/or send them to another.
+    '''
+
+    def __init__(
+            self,
+            get: Optional[Callable[[], int]] = None,
+            put: Optional[Callable[[int], None]] = None) -> None:
+        self.getter = get
+        self.putter = put
+
+    def get(self) -> int:
+        if self.getter is None:
+            return super().get()
+        return self.getter()
+
+    def put(self, value: int) -> None:
+        if self.putter is None:
+            return super().put(value)
+        self.putter(value)
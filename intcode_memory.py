@@ -0,0 +1,164 @@
+from __future__ import annotations
+from array import array
+from itertools import chain
+from typing import (Callable, Dict, Iterable, Iterator, List, Sequence, Tuple,
+                    Union)
+
+
+PAGE_BITS: int = 6
+PAGE_SIZE: int = 1 << PAGE_BITS
+PAGE_MASK: int = PAGE_SIZE - 1
+
+Page = Union[List[int], Tuple[int, ...]]
+Pages = Tuple[Tuple[int, ...], ...]
+
+
+class PagedMemory:
+    '''
+    Intcode memory split into fixed-size pages. Pages stored as tuples are
+    shared with copies of this memory, and are copied into a private list
+    the first time they are written to.
+    '''
+
+    def __init__(self, pages: Iterable[Page], size: int) -> None:
+        self.pages: List[Page] = list(pages)
+        self.size: int = size
+
+    @classmethod
+    def from_values(cls, values: Sequence[int]) -> PagedMemory:
+        '''
+        Build a new PagedMemory holding a copy of the given values.
+        '''
+        return cls(cls.split(values), len(values))
+
+    @classmethod
+    def split(cls, values: Sequence[int]) -> Pages:
+        '''
+        Split values into a tuple of immutable pages.
+        '''
+        return tuple(tuple(values[i:i + PAGE_SIZE])
+                     for i in range(0, len(values), PAGE_SIZE))
+
+    def freeze(self) -> None:
+        '''
+        Make every page immutable, so it can be shared. This memory copies a
+        page again before its next write.
+        '''
+        pages = self.pages
+        for index, page in enumerate(pages):
+            if type(page) is list:
+                pages[index] = tuple(page)
+
+    def copy(self) -> PagedMemory:
+        '''
+        Return a copy-on-write copy of this memory. Only the page references
+        are copied.
+        '''
+        self.freeze()
+        return type(self)(self.pages, self.size)
+
+    __copy__ = copy
+
+    def __getitem__(self, address):
+        if type(address) is slice:
+            return [self[i] for i in range(*address.indices(self.size))]
+        if address < 0:
+            raise IndexError(f'negative address {address}')
+        return self.pages[address >> PAGE_BITS][address & PAGE_MASK]
+
+    def __setitem__(self, address: int, value: int) -> None:
+        if address < 0:
+            raise IndexError(f'negative address {address}')
+        index = address >> PAGE_BITS
+        page = self.pages[index]
+        if type(page) is tuple:
+            page = self.pages[index] = list(page)
+        page[address & PAGE_MASK] = value  # type: ignore
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self) -> Iterator[int]:
+        return chain.from_iterable(self.pages)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (PagedMemory, list)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({list(self)!r})'
+
+
+class SparseMemory(PagedMemory):
+    '''
+    Paged memory for programs that address far past the end of their image.
+    Pages are allocated on first write, reading an unallocated address
+    returns 0, and the size grows to cover the highest address written.
+    '''
+
+    def __init__(self, pages: Dict[int, Page], size: int) -> None:
+        self.pages: Dict[int, Page] = dict(pages)  # type: ignore
+        self.size = size
+
+    @classmethod
+    def from_values(cls, values: Sequence[int]) -> SparseMemory:
+        '''
+        Build a new SparseMemory holding a copy of the given values.
+        '''
+        padded = list(values) + [0] * (-len(values) % PAGE_SIZE)
+        return cls(dict(enumerate(cls.split(padded))), len(values))
+
+    def freeze(self) -> None:
+        pages = self.pages
+        for index, page in pages.items():  # type: ignore
+            if type(page) is list:
+                pages[index] = tuple(page)
+
+    def __getitem__(self, address):
+        if type(address) is slice:
+            return [self[i] for i in range(*address.indices(self.size))]
+        if address < 0:
+            raise IndexError(f'negative address {address}')
+        page = self.pages.get(address >> PAGE_BITS)  # type: ignore
+        if page is None:
+            return 0
+        return page[address & PAGE_MASK]
+
+    def __setitem__(self, address: int, value: int) -> None:
+        if address < 0:
+            raise IndexError(f'negative address {address}')
+        index = address >> PAGE_BITS
+        page = self.pages.get(index)  # type: ignore
+        if page is None:
+            page = self.pages[index] = [0] * PAGE_SIZE
+        elif type(page) is tuple:
+            page = self.pages[index] = list(page)
+        page[address & PAGE_MASK] = value  # type: ignore
+        if address >= self.size:
+            self.size = address + 1
+
+    def __iter__(self) -> Iterator[int]:
+        for address in range(self.size):
+            yield self[address]
+
+
+def int64_array(values: Sequence[int]) -> Union[array, List[int]]:
+    '''
+    Store values in a flat array of signed 64-bit ints, or in a list if any
+    of them do not fit.
+    '''
+    try:
+        return array('q', values)
+    except OverflowError:
+        return list(values)
+
+
+Memory = Union[List[int], array, PagedMemory]
+
+BACKENDS: Dict[str, Callable[[Sequence[int]], Memory]] = {  # name -> builder
+    'list': list,
+    'array': int64_array,
+    'paged': PagedMemory.from_values,
+    'sparse': SparseMemory.from_values,
+}
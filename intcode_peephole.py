@@ -0,0 +1,195 @@
+from __future__ import annotations
+from time import perf_counter
+from typing import (TYPE_CHECKING, Any, Callable, Dict, List, NamedTuple,
+                    Optional, Sequence, Tuple)
+
+from intcode_compiler import (CONDITIONS, EXPRESSIONS, code_changed,
+                              jump_target, operand)
+
+if TYPE_CHECKING:
+    from intcode import Computer, Intcodes
+
+
+FUSED: int = 0  # opcode of a superinstruction in the decode cache
+
+COMPARES = (7, 8)
+JUMPS = (5, 6)
+
+# Instruction sequences worth fusing, longest first: opcodes -> pattern.
+PATTERNS: Dict[Tuple[int, ...], str] = {}
+for _compare in COMPARES:
+    for _jump in JUMPS:
+        PATTERNS[1, _compare, _jump] = 'count-loop'
+for _compare in COMPARES:
+    for _jump in JUMPS:
+        PATTERNS[_compare, _jump] = 'compare-jump'
+    PATTERNS[_compare, 2] = 'compare-scale'
+for _jump in JUMPS:
+    PATTERNS[1, _jump] = 'add-jump'
+    PATTERNS[2, _jump] = 'multiply-jump'
+PATTERNS[2, 1] = 'multiply-add'
+
+
+class Superinstruction(NamedTuple):
+    pattern: str
+    start: int  # address of the first instruction
+    end: int  # first address after the last instruction
+    function: Callable  # (computer, memory) -> None, sets the pointer
+    source: str
+
+
+def fetch_memory(m: Intcodes, p: int) -> Tuple[Intcodes]:
+    '''
+    Fetch the arguments of a superinstruction: its operands are compiled in,
+    so it only needs the memory.
+    '''
+    return m,
+
+
+def match(computer: Computer, start: int) -> List[Tuple[int, ...]]:
+    '''
+    Decode the instructions of the original program from start that could
+    begin a pattern. Return (address, opcode, *modes) for each, stopping at
+    the first that cannot be fused.
+    '''
+    memory = computer.original_program
+    found: List[Tuple[int, ...]] = []
+    address = start
+    longest = max(len(opcodes) for opcodes in PATTERNS)
+    while len(found) < longest and address < len(memory):
+        try:
+            opcode, *modes = computer.parse_opvalue(memory[address])
+        except (KeyError, ValueError):
+            break
+        if opcode not in EXPRESSIONS and opcode not in CONDITIONS:
+            break
+        found.append((address, opcode, *modes))
+        address += computer.num_params[opcode] + 1
+        if opcode in CONDITIONS:
+            break
+    return found
+
+
+def fuse(computer: Computer, start: int) -> Optional[Superinstruction]:
+    '''
+    Fuse the longest pattern of instructions beginning at start in the
+    original program into one Python function. Operands are compiled in as
+    constants, and a value stored earlier in the superinstruction is reused
+    instead of being read back from memory. Stores still go through
+    computer.write, so memory and the decode cache stay exact. Return None
+    if no pattern starts here, or if the instructions would write to their
+    own code. The function first checks that memory from start to end still
+    holds that code; if not, it drops itself from the decode cache without
+    moving the pointer, so the instruction there is decoded again.
+    '''
+    found = match(computer, start)
+    while found and tuple(x[1] for x in found) not in PATTERNS:
+        found.pop()
+    if not found:
+        return None
+    memory = computer.original_program
+    last_address, last_opcode = found[-1][:2]
+    end = last_address + computer.num_params[last_opcode] + 1
+    if end > len(memory):
+        return None
+
+    stored: Dict[int, str] = {}  # address -> local holding its value
+
+    def parameter(address: int, mode: int) -> str:
+        if mode == 0 and memory[address] in stored:  # position mode
+            return stored[memory[address]]
+        return operand(memory, address, mode)
+
+    def constant(expression: str) -> str:
+        # Fold an expression of immediate operands, like a call's return
+        # address or an unconditional jump.
+        if 'm[' in expression or 'v' in expression:
+            return expression
+        return str(int(eval(expression)))
+
+    code = memory[start:end]
+    lines: List[str] = [f'if {code_changed(start, end)}:',
+                        f'    c.decoded.pop({start}, None)',
+                        '    return']
+    stale = False  # a write may have replaced the memory list
+    for k, (address, opcode, *modes) in enumerate(found):
+        a = parameter(address + 1, modes[0])
+        b = parameter(address + 2, modes[1])
+        if stale and 'm[' in a + b:
+            lines.append('m = c.memory')
+            stale = False
+        if opcode in CONDITIONS:
+            b = jump_target(lines, b)
+            condition = constant(CONDITIONS[opcode].format(a=a))
+            if condition in ('0', '1'):
+                lines.append(f'c.pointer = {b if condition == "1" else end}')
+            else:
+                lines.append(f'c.pointer = {b} if {condition} else {end}')
+            break
+        destination = memory[address + 3]
+        if start <= destination < end:
+            return None
+        value = constant(EXPRESSIONS[opcode].format(a=a, b=b))
+        lines.append(f'v{k} = {value}')
+        lines.append(f'c.write({destination}, v{k})')
+        stored[destination] = f'v{k}'
+        stale = True
+    else:
+        lines.append(f'c.pointer = {end}')
+    source = 'def fused(c, m):\n' + ''.join(f'    {x}\n' for x in lines)
+    namespace: Dict[str, Any] = {'code': code}
+    exec(compile(source, f'<intcode superinstruction {start}>', 'exec'),
+         namespace)
+    return Superinstruction(PATTERNS[tuple(x[1] for x in found)],
+                            start,
+                            end,
+                            namespace['fused'],
+                            source)
+
+
+def report(
+        runs: Sequence[Tuple[str, Intcodes, List[int]]],
+        repeat: int = 1000) -> List[str]:
+    '''
+    Time each (name, program, inputs) run on the interpreter with and
+    without the peephole pass. Return a line per program with the patterns
+    fused and the speedup.
+    '''
+    from intcode import Computer
+    from intcode_io import DequeChannel
+    lines = []
+    for name, program, inputs in runs:
+        computers = [Computer(program,
+                              peephole=peephole,
+                              input_channel=DequeChannel())
+                     for peephole in (False, True)]
+        times = [float('inf')] * 2
+        for _ in range(repeat):  # alternate, so both see the same noise
+            for i, computer in enumerate(computers):
+                computer.initialize_memory()
+                computer.set_inputs(inputs)
+                start = perf_counter()
+                computer.run()
+                times[i] = min(times[i], perf_counter() - start)
+        patterns: Dict[str, int] = {}
+        for fused in computers[1].superinstructions.values():
+            if fused is None:
+                continue
+            patterns[fused.pattern] = patterns.get(fused.pattern, 0) + 1
+        found = ', '.join(f'{p} x{n}' for p, n in sorted(patterns.items()))
+        lines.append(f'{name}: {times[0] * 1e6:.0f} -> ' +
+                     f'{times[1] * 1e6:.0f} us, ' +
+                     f'{times[0] / times[1]:.2f}x ({found or "no patterns"})')
+    return lines
+
+
+if __name__ == '__main__':
+    from intcode import Computer
+    day02 = Computer.parse_file('input_day02.txt')
+    day02[1:3] = [12, 2]
+    day05 = Computer.parse_file('input_day05.txt')
+    day07 = Computer.parse_file('input_day07.txt')
+    print('\n'.join(report([('day02', day02, []),
+                            ('day05 part 1', day05, [1]),
+                            ('day05 part 2', day05, [5]),
+                            ('day07 amp', day07, [4, 0])])))
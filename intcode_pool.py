@@ -0,0 +1,60 @@
+from __future__ import annotations
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Tuple
+
+from intcode import Computer, Intcodes
+
+
+class ComputerPool:
+    '''
+    Hand out Computers for a program and take them back for reuse. A
+    returned computer keeps its decoded instructions, compiled blocks and
+    memory, and is reset on release, which only restores the memory pages
+    it wrote to. Computers are pooled per program list: pass the same list
+    to share them. Keyword arguments are passed to every new Computer.
+    '''
+
+    def __init__(self, **options: Any) -> None:
+        self.options: Dict[str, Any] = options
+        # id(program) -> (program, idle computers). Holding the program
+        # keeps its id from being reused by another list.
+        self.idle: Dict[int, Tuple[Intcodes, List[Computer]]] = {}
+        self.created: int = 0
+        self.reused: int = 0
+
+    def acquire(self, program: Intcodes) -> Computer:
+        '''
+        Return an idle computer for the program, ready to run from address
+        0, or a new one if none is idle.
+        '''
+        entry = self.idle.get(id(program))
+        if entry is not None and entry[1]:
+            self.reused += 1
+            return entry[1].pop()
+        self.created += 1
+        return Computer(program, **self.options)
+
+    def release(self, computer: Computer) -> None:
+        '''
+        Reset a computer and keep it for the next caller. Only the memory
+        pages it wrote to are restored, so its memory must only have been
+        changed by running it.
+        '''
+        computer.reset_written()
+        computer.set_inputs()
+        program = computer.original_program
+        self.idle.setdefault(id(program), (program, []))[1].append(computer)
+
+    @contextmanager
+    def computer(self, program: Intcodes) -> Iterator[Computer]:
+        '''
+        Acquire a computer for the duration of a with block.
+        '''
+        computer = self.acquire(program)
+        try:
+            yield computer
+        finally:
+            self.release(computer)
+
+    def __len__(self) -> int:
+        return sum(len(computers) for _, computers in self.idle.values())
@@ -0,0 +1,71 @@
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+
+class Profile:
+    '''
+    Execution counts collected by a Computer created with profile=True.
+    '''
+
+    def __init__(self, names: Dict[int, str]) -> None:
+        self.names: Dict[int, str] = names  # opcode -> name
+        self.executed: Counter[Tuple[int, int]] = Counter()  # (address, op)
+        self.run_times: List[float] = []  # wall time of each run, in seconds
+
+    @property
+    def instructions(self) -> int:
+        '''
+        Total number of instructions executed, including halts.
+        '''
+        return sum(self.executed.values())
+
+    def opcodes(self) -> Counter[int]:
+        '''
+        Count executed instructions per opcode.
+        '''
+        counts: Counter[int] = Counter()
+        for (_, opcode), count in self.executed.items():
+            counts[opcode] += count
+        return counts
+
+    def addresses(self) -> Counter[int]:
+        '''
+        Count executed instructions per address.
+        '''
+        counts: Counter[int] = Counter()
+        for (address, _), count in self.executed.items():
+            counts[address] += count
+        return counts
+
+    def as_dict(self) -> Dict[str, Any]:
+        '''
+        Export the profile as a dict of plain Python values.
+        '''
+        return {
+            'instructions': self.instructions,
+            'opcodes': {self.names.get(op, str(op)): count
+                        for op, count in sorted(self.opcodes().items())},
+            'addresses': dict(sorted(self.addresses().items())),
+            'runs': len(self.run_times),
+            'run_times': list(self.run_times),
+            'total_time': sum(self.run_times),
+        }
+
+    def folded(self) -> List[str]:
+        '''
+        Return the profile as folded stacks (intcode;opcode;address count),
+        the input format of flamegraph.pl and compatible viewers.
+        '''
+        return [f'intcode;{self.names.get(op, str(op))};{address} {count}'
+                for (address, op), count in sorted(self.executed.items())]
+
+    def write_folded(self, filename: str) -> None:
+        '''
+        Write the folded stacks to the given file.
+        '''
+        with open(filename, 'w') as f:
+            f.writelines(line + '\n' for line in self.folded())
+
+    def reset(self) -> None:
+        self.executed.clear()
+        self.run_times.clear()
@@ -0,0 +1,159 @@
+from __future__ import annotations
+import heapq
+from itertools import count
+from time import perf_counter
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from intcode import Computer
+
+
+STRIDE: int = 1 << 20  # pass added per full slice at priority 1
+
+
+class Task:
+    '''
+    A Computer managed by a Scheduler. Tasks with a higher priority get
+    proportionally more slices.
+    '''
+
+    def __init__(
+            self,
+            computer: Computer,
+            priority: int = 1,
+            name: Optional[str] = None) -> None:
+        if priority < 1:
+            raise ValueError(f'Priority must be at least 1, got {priority}.')
+        self.computer: Computer = computer
+        self.priority: int = priority
+        self.name: Optional[str] = name
+        self.status: str = 'ready'  # ready, blocked or halted
+        self.pass_value: float = 0.0  # virtual time used, scaled by priority
+        self.instructions: int = 0
+        self.slices: int = 0
+        self.targets: List[Task] = []  # tasks that receive this one's outputs
+
+    def __repr__(self) -> str:
+        return (f'Task({self.name or id(self.computer)}, {self.status}, ' +
+                f'instructions={self.instructions})')
+
+
+class Metrics(NamedTuple):
+    ready: int  # queue depth: tasks waiting for a slice
+    blocked: int  # tasks parked until an input arrives
+    halted: int
+    slices: int
+    instructions: int
+    elapsed: float  # seconds spent running slices
+    instructions_per_second: float
+
+
+class Scheduler:
+    '''
+    Multiplex many Computers in one thread. Each runs for at most
+    slice_size instructions at a time, so a runaway program cannot starve
+    the others. Tasks waiting for input are parked until sent a value;
+    values from a computer's own input channel are only taken when it can
+    poll them without waiting, when the task is given a slice.
+    Ready tasks are picked by stride scheduling: the task that has used the
+    least CPU time relative to its priority goes next.
+    '''
+
+    def __init__(self, slice_size: int = 1000) -> None:
+        self.slice_size: int = slice_size
+        self.tasks: List[Task] = []
+        self.ready: List[Tuple[float, int, Task]] = []  # heap
+        self.order: Iterator[int] = count()  # ties go first come first served
+        self.slices: int = 0
+        self.instructions: int = 0
+        self.elapsed: float = 0.0
+
+    def add(
+            self,
+            computer: Computer,
+            priority: int = 1,
+            name: Optional[str] = None) -> Task:
+        '''
+        Add a computer, ready to run from its current pointer.
+        '''
+        task = Task(computer, priority, name)
+        self.tasks.append(task)
+        self.wake(task)
+        return task
+
+    def connect(self, source: Task, target: Task) -> None:
+        '''
+        Send every output of source to target as an input.
+        '''
+        source.targets.append(target)
+
+    def send(self, task: Task, value: int) -> None:
+        '''
+        Queue an input for a task, waking it if it was blocked.
+        '''
+        task.computer.inputs.append(value)
+        if task.status == 'blocked':
+            self.wake(task)
+
+    def wake(self, task: Task) -> None:
+        # A task returning from a wait must not be owed the time it spent
+        # parked, or it would monopolize the processor to catch up.
+        if self.ready:
+            task.pass_value = max(task.pass_value, self.ready[0][0])
+        self.enqueue(task)
+
+    def enqueue(self, task: Task) -> None:
+        task.status = 'ready'
+        heapq.heappush(self.ready, (task.pass_value, next(self.order), task))
+
+    def run_once(self) -> Optional[Task]:
+        '''
+        Give one slice to the next ready task. Return it, or None if no task
+        is ready.
+        '''
+        if not self.ready:
+            return None
+        _, _, task = heapq.heappop(self.ready)
+        computer = task.computer
+        start = perf_counter()
+        status, executed = computer.run_slice(self.slice_size)
+        self.elapsed += perf_counter() - start
+        self.slices += 1
+        self.instructions += executed
+        task.slices += 1
+        task.instructions += executed
+        task.pass_value += (STRIDE / task.priority *
+                            max(executed, 1) / self.slice_size)
+        if status == 'ready':
+            self.enqueue(task)
+        else:
+            task.status = status
+        if task.targets and computer.outputs:
+            for value in computer.outputs:
+                for target in task.targets:
+                    self.send(target, value)
+            computer.outputs.clear()
+        return task
+
+    def run(self, max_slices: Optional[int] = None) -> Metrics:
+        '''
+        Run slices until no task is ready, because every task has halted or
+        is waiting for input, or until max_slices have been run.
+        '''
+        slices = 0
+        while self.ready and (max_slices is None or slices < max_slices):
+            self.run_once()
+            slices += 1
+        return self.metrics()
+
+    def metrics(self) -> Metrics:
+        counts: Dict[str, int] = {'ready': 0, 'blocked': 0, 'halted': 0}
+        for task in self.tasks:
+            counts[task.status] += 1
+        rate = self.instructions / self.elapsed if self.elapsed else 0.0
+        return Metrics(counts['ready'],
+                       counts['blocked'],
+                       counts['halted'],
+                       self.slices,
+                       self.instructions,
+                       self.elapsed,
+                       rate)
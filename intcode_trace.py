@@ -0,0 +1,333 @@
+from __future__ import annotations
+import struct
+from bisect import bisect_right
+from typing import (BinaryIO, Callable, Dict, Iterator, List, NamedTuple,
+                    Optional, Tuple)
+
+from intcode import Computer, Intcodes
+from intcode_memory import BACKENDS
+
+# Trace file:
+#   MAGIC
+#   records, each a tag byte and zigzag varints:
+#     STEP        pointer, opvalue, each operand as fetched, then the value
+#                 stored if the opcode stores one (at the last operand)
+#     CHECKPOINT  step, pointer, memory size, then every memory value
+#     INDEX       count, then (step, file offset) of every checkpoint
+#   TRAILER: file offset of the index and MAGIC, as '<Q4s'
+MAGIC: bytes = b'ICT1'
+TRAILER = struct.Struct('<Q4s')
+STEP, CHECKPOINT, INDEX = 0, 1, 2
+
+
+def put(buffer: bytearray, value: int) -> None:
+    '''
+    Append an int of any size to buffer as a zigzag varint: 7 bits per
+    byte, low bits first, with small magnitudes of either sign in one byte.
+    '''
+    value = value << 1 if value >= 0 else (-value << 1) - 1
+    while value >= 0x80:
+        buffer.append(value & 0x7f | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def get(data: bytes, offset: int) -> Tuple[int, int]:
+    '''
+    Read a zigzag varint at offset. Return it and the offset after it.
+    '''
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            break
+        shift += 7
+    return (value >> 1) if not value & 1 else -((value + 1) >> 1), offset
+
+
+class Step(NamedTuple):
+    index: int  # number of steps before this one
+    pointer: int
+    opvalue: int
+    operands: Tuple[int, ...]  # after applying parameter modes
+    write: Optional[Tuple[int, int]]  # (address, value) stored
+
+
+class TraceWriter:
+    '''
+    Write a trace file. Records are collected in a buffer, which is written
+    out whenever it grows past buffer_size and when the writer is closed.
+    '''
+
+    def __init__(
+            self,
+            filename: str,
+            checkpoint_every: int = 4096,
+            buffer_size: int = 1 << 16) -> None:
+        self.file: BinaryIO = open(filename, 'wb')
+        self.checkpoint_every: int = checkpoint_every
+        self.buffer_size: int = buffer_size
+        self.buffer: bytearray = bytearray(MAGIC)
+        self.offset: int = 0  # file offset of the buffer
+        self.steps: int = 0
+        self.checkpoints: List[Tuple[int, int]] = []  # (step, offset)
+
+    def __enter__(self) -> TraceWriter:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def step(
+            self,
+            pointer: int,
+            opvalue: int,
+            operands: Tuple[int, ...],
+            stored: Optional[int]) -> None:
+        buffer = self.buffer
+        buffer.append(STEP)
+        put(buffer, pointer)
+        put(buffer, opvalue)
+        for operand in operands:
+            put(buffer, operand)
+        if stored is not None:
+            put(buffer, stored)
+        self.steps += 1
+        if len(buffer) >= self.buffer_size:
+            self.flush()
+
+    def checkpoint(self, pointer: int, memory: Intcodes) -> None:
+        self.checkpoints.append((self.steps,
+                                 self.offset + len(self.buffer)))
+        buffer = self.buffer
+        buffer.append(CHECKPOINT)
+        put(buffer, self.steps)
+        put(buffer, pointer)
+        put(buffer, len(memory))
+        for value in memory:
+            put(buffer, value)
+
+    def flush(self) -> None:
+        self.file.write(self.buffer)
+        self.offset += len(self.buffer)
+        self.buffer.clear()
+
+    def close(self) -> None:
+        if self.file.closed:
+            return
+        index = self.offset + len(self.buffer)
+        buffer = self.buffer
+        buffer.append(INDEX)
+        put(buffer, len(self.checkpoints))
+        for step, offset in self.checkpoints:
+            put(buffer, step)
+            put(buffer, offset)
+        buffer += TRAILER.pack(index, MAGIC)
+        self.flush()
+        self.file.close()
+
+
+def record(
+        computer: Computer,
+        filename: str,
+        checkpoint_every: int = 4096,
+        stop_at_first_output: bool = False) -> List[int]:
+    '''
+    Run the computer from its current state like Computer.run, writing a
+    trace of every instruction executed to filename, with a checkpoint of
+    the whole memory every checkpoint_every steps. Instructions are decoded
+    one at a time, whatever the computer's engine, so each gets its own
+    step. Return the outputs.
+    '''
+    decoders: Dict[int, Tuple[int, Callable, Callable]] = {}  # by opvalue
+    operations = computer.operations
+    stores = computer.stores
+    with TraceWriter(filename, checkpoint_every) as writer:
+        until_checkpoint = 0
+        while True:
+            if until_checkpoint == 0:
+                writer.checkpoint(computer.pointer, list(computer.memory))
+                until_checkpoint = checkpoint_every
+            until_checkpoint -= 1
+            pointer = computer.pointer
+            opvalue = computer.memory[pointer]
+            decoder = decoders.get(opvalue)
+            if decoder is None:
+                opcode, *modes = computer.parse_opvalue(opvalue)
+                decoder = decoders[opvalue] = (opcode,
+                                               operations.get(opcode),
+                                               computer.fetcher(tuple(modes)))
+            opcode, op, fetch = decoder
+            operands = fetch(computer.memory, pointer)
+            if opcode == 99:  # halt
+                writer.step(pointer, opvalue, operands, None)
+                return computer.outputs
+            output = op(*operands)
+            stored = (computer.memory[operands[-1]] if opcode in stores
+                      else None)
+            writer.step(pointer, opvalue, operands, stored)
+            if stop_at_first_output and output:
+                return computer.outputs
+
+
+class Replayer:
+    '''
+    Read a trace file. The state before any step is rebuilt from the
+    checkpoint before it by applying the recorded writes, without executing
+    any instructions.
+    '''
+
+    def __init__(self, filename: str) -> None:
+        with open(filename, 'rb') as f:
+            self.data: bytes = f.read()
+        data = self.data
+        if (len(data) < len(MAGIC) + TRAILER.size
+                or not data.startswith(MAGIC)):
+            raise ValueError(f'{filename} is not an intcode trace.')
+        index, magic = TRAILER.unpack_from(data, len(data) - TRAILER.size)
+        if magic != MAGIC or data[index] != INDEX:
+            raise ValueError(f'{filename} is truncated; it has no index.')
+        self.end: int = index  # offset of the index record
+        count, offset = get(data, index + 1)
+        self.checkpoints: List[Tuple[int, int]] = []  # (step, offset)
+        for _ in range(count):
+            step, offset = get(data, offset)
+            position, offset = get(data, offset)
+            self.checkpoints.append((step, position))
+        self.steps: int = self.count_steps()
+
+    def count_steps(self) -> int:
+        if not self.checkpoints:
+            return 0
+        step, offset = self.checkpoints[-1]
+        for record in self.records(offset):
+            step = record.index + 1
+        return step
+
+    def __len__(self) -> int:
+        return self.steps
+
+    def checkpoint_before(self, step: int) -> int:
+        '''
+        Return the offset of the last checkpoint at or before step.
+        '''
+        position = bisect_right(self.checkpoints, (step, float('inf'))) - 1
+        return self.checkpoints[position][1]
+
+    def load_checkpoint(
+            self,
+            offset: int) -> Tuple[int, int, Intcodes, int]:
+        '''
+        Decode the checkpoint at offset. Return its step, pointer, memory,
+        and the offset of the record after it.
+        '''
+        data = self.data
+        step, offset = get(data, offset + 1)
+        pointer, offset = get(data, offset)
+        size, offset = get(data, offset)
+        memory = []
+        for _ in range(size):
+            value, offset = get(data, offset)
+            memory.append(value)
+        return step, pointer, memory, offset
+
+    def records(
+            self,
+            offset: int = len(MAGIC),
+            index: int = 0) -> Iterator[Step]:
+        '''
+        Decode the steps from the record at offset, which is step index, to
+        the end of the trace, skipping checkpoints.
+        '''
+        data = self.data
+        while offset < self.end:
+            tag = data[offset]
+            if tag == CHECKPOINT:
+                step, offset = get(data, offset + 1)
+                index = step
+                _, offset = get(data, offset)
+                size, offset = get(data, offset)
+                for _ in range(size):
+                    _, offset = get(data, offset)
+                continue
+            pointer, offset = get(data, offset + 1)
+            opvalue, offset = get(data, offset)
+            opcode = opvalue % 100
+            operands = []
+            for _ in range(Computer.num_params[opcode]):
+                operand, offset = get(data, offset)
+                operands.append(operand)
+            write = None
+            if opcode in Computer.stores:
+                value, offset = get(data, offset)
+                write = (operands[-1], value)
+            yield Step(index, pointer, opvalue, tuple(operands), write)
+            index += 1
+
+    def __iter__(self) -> Iterator[Step]:
+        return self.records()
+
+    def state(self, step: int) -> Tuple[int, Intcodes]:
+        '''
+        Return the pointer and memory before the given step. Step len(self)
+        is the state the trace ends in.
+        '''
+        if not 0 <= step <= self.steps:
+            raise IndexError(f'Step {step} is outside the trace, which has ' +
+                             f'{self.steps} steps.')
+        index, pointer, memory, offset = self.load_checkpoint(
+            self.checkpoint_before(step))
+        for record in self.records(offset, index):
+            if record.index == step:
+                return record.pointer, memory
+            if record.write is not None:
+                address, value = record.write
+                if address >= len(memory):  # sparse memory grew
+                    memory.extend([0] * (address + 1 - len(memory)))
+                memory[address] = value
+            pointer = self.next_pointer(record)
+        return pointer, memory
+
+    @staticmethod
+    def next_pointer(record: Step) -> int:
+        '''
+        Return the pointer after a step, from its recorded operands.
+        '''
+        opcode = record.opvalue % 100
+        if opcode == 5 and record.operands[0] != 0:
+            return record.operands[1]
+        if opcode == 6 and record.operands[0] == 0:
+            return record.operands[1]
+        if opcode == 99:
+            return record.pointer
+        return record.pointer + len(record.operands) + 1
+
+    def __getitem__(self, step: int) -> Step:
+        if not 0 <= step < self.steps:
+            raise IndexError(f'Step {step} is outside the trace, which has ' +
+                             f'{self.steps} steps.')
+        for record in self.records(self.checkpoint_before(step)):
+            if record.index == step:
+                return record
+        raise IndexError(step)
+
+    def computer(self, step: int, **kwargs: object) -> Computer:
+        '''
+        Return a Computer in the state before the given step, with the
+        inputs the recorded run took from then on queued, so running it
+        repeats the rest of the trace. Keyword arguments are passed to the
+        Computer.
+        '''
+        pointer, memory = self.state(step)
+        _, _, program, _ = self.load_checkpoint(self.checkpoints[0][1])
+        computer = Computer(program, **kwargs)  # type: ignore
+        computer.memory = BACKENDS[computer.backend](memory)
+        computer.pointer = pointer
+        computer.set_inputs([record.write[1]  # type: ignore
+                             for record in self.records(
+                                 self.checkpoint_before(step))
+                             if record.index >= step
+                             and record.opvalue % 100 == 3])
+        return computer
@@ -1,3 +1,11 @@
+import bz2
+import gzip
+import io
+import lzma
+from pathlib import Path
+
+import pytest
+
 import day01
 
 
@@ -20,3 +28,78 @@ def test_part1():
 
 def test_part2():
     assert day01.part2('input_day01.txt') == 4973616
+
+
+def test_vectorized_matches_scalar():
+    np = pytest.importorskip('numpy')
+    rng = np.random.default_rng(1)
+    masses = (rng.integers(-100, 10 ** 6, 5000).tolist() +
+              rng.integers(-2 ** 63, 2 ** 63 - 1, 100,
+                           endpoint=True).tolist() +
+              [0, 1, 6, 8, 9, 14, 2 ** 63 - 1, -2 ** 63])
+    for include_fuel_mass in (False, True):
+        assert (day01.total_fuel(masses, include_fuel_mass, vectorized=True,
+                                 chunk_size=1000) ==
+                day01.total_fuel(masses, include_fuel_mass))
+
+
+def test_vectorized_big_values():
+    pytest.importorskip('numpy')
+    # Sums past int64, and masses that do not fit in it at all.
+    masses = [2 ** 63 - 1] * 10 + [2 ** 70, 12]
+    for include_fuel_mass in (False, True):
+        assert (day01.total_fuel(masses, include_fuel_mass, vectorized=True,
+                                 chunk_size=5) ==
+                day01.total_fuel(masses, include_fuel_mass))
+
+
+def test_vectorized_parts():
+    pytest.importorskip('numpy')
+    masses = day01.parse_input('input_day01.txt')
+    assert day01.total_fuel(masses, vectorized=True) == 3317659
+    masses = day01.parse_input('input_day01.txt')
+    assert day01.total_fuel(masses, True, vectorized=True) == 4973616
+
+
+def write_manifest(path, masses, opener=open):
+    with opener(path, 'wb') as f:
+        f.write(''.join(f'{mass}\n' for mass in masses).encode())
+    return str(path)
+
+
+@pytest.mark.parametrize('opener', [open, gzip.open, bz2.open, lzma.open])
+def test_stream_total_fuel(tmp_path, opener):
+    pytest.importorskip('numpy')
+    lines = Path('input_day01.txt').read_text().split()
+    masses = [int(line) for line in lines] * 50
+    manifest = write_manifest(tmp_path / 'masses', masses, opener)
+    assert list(day01.parse_input(manifest)) == masses
+    for include_fuel_mass in (False, True):
+        assert (day01.stream_total_fuel(manifest, include_fuel_mass,
+                                        block_size=100) ==
+                day01.total_fuel(masses, include_fuel_mass))
+
+
+def test_stream_awkward_lines(tmp_path):
+    pytest.importorskip('numpy')
+    masses = [12, 2 ** 63 - 1, 2 ** 70, -2 ** 63, 1969, -7, 10 ** 40, 0]
+    manifest = tmp_path / 'masses'
+    manifest.write_bytes(b'\n'.join(str(x).encode() for x in masses) +
+                         b'\n\n  \n100756')  # no newline at the end
+    masses.append(100756)
+    for block_size in (1, 7, 1 << 10):
+        for include_fuel_mass in (False, True):
+            assert (day01.stream_total_fuel(str(manifest), include_fuel_mass,
+                                            block_size) ==
+                    day01.total_fuel(masses, include_fuel_mass))
+    manifest.write_bytes(b'12\n-\n')
+    with pytest.raises(ValueError):
+        day01.stream_total_fuel(str(manifest))
+
+
+def test_stream_stdin(monkeypatch):
+    pytest.importorskip('numpy')
+    data = gzip.compress(Path('input_day01.txt').read_bytes())
+    stdin = io.TextIOWrapper(io.BufferedReader(io.BytesIO(data)))
+    monkeypatch.setattr('sys.stdin', stdin)
+    assert day01.stream_total_fuel('-', True) == 4973616
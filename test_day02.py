@@ -20,3 +20,46 @@ def test_determine_inputs():
 
 def test_part2():
     assert day02.part2('input_day02.txt') == 7749
+
+
+def test_symbolic_step():
+    program = day02.parse_input('input_day02.txt')
+    expression = day02.symbolic_step(program)
+    for noun, verb in [(12, 2), (77, 49), (0, 99)]:
+        concrete = day02.step(day02.set_inputs(list(program), noun, verb))
+        assert concrete[0] == sum(coeff * noun ** i * verb ** j
+                                  for (i, j), coeff in expression.items())
+
+
+def test_determine_inputs_symbolic():
+    program = day02.parse_input('input_day02.txt')
+    assert day02.determine_inputs(program, 3516593, symbolic=True) == (12, 2)
+    assert day02.determine_inputs(program, 19690720, symbolic=True) == (
+        77, 49)
+    assert day02.determine_inputs(program, -1, symbolic=True) is False
+
+
+def test_determine_inputs_symbolic_ranges():
+    program = day02.parse_input('input_day02.txt')
+    nouns, verbs = range(50, 80), range(40, 60)
+    assert (day02.determine_inputs(program, 19690720, nouns, verbs,
+                                   symbolic=True) ==
+            day02.determine_inputs(program, 19690720, nouns, verbs))
+
+
+def test_solve_inputs_nonlinear():
+    # noun * verb * verb + 1
+    expression = {(1, 2): 1, (0, 0): 1}
+    assert day02.solve_inputs(expression, 50, range(10), range(10)) == (1, 7)
+    assert day02.solve_inputs(expression, 2, range(10), range(10)) == (1, 1)
+
+
+def test_step_long_program():
+    program = day02.make_program(5000)
+    assert day02.step(program)[0] == 2
+
+
+def test_scaling_report():
+    lines = day02.scaling_report([10, 2000], repeat=1)
+    assert len(lines) == 2
+    assert lines[1].startswith('2000 instructions: ')
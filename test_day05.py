@@ -20,3 +20,27 @@ def test_parse_parameters():
 def test_step():
     program = '1002,4,3,4,33'.split(',')
     assert day05.step(program, 0) == ('1002,4,3,4,99'.split(','), 4)
+
+
+def test_step_does_not_recurse():
+    # Count down from 5000 in a loop: 10000 instructions.
+    program = '1001,9,-1,9,1005,9,0,99,0,5000'.split(',')
+    memory, pointer = day05.step(program)
+    assert memory[9] == '0'
+    assert pointer == 7
+
+
+def test_diagnostics():
+    program = day05.Computer.parse_file('input_day05.txt')
+    results = day05.diagnostics(program, [1, 5, 1])
+    assert list(results) == [1, 5]
+    assert results[1][-1] == 7988899
+    assert not any(results[1][:-1])
+    assert results[5] == [13758663]
+
+
+def test_parts():
+    assert day05.part1('input_day05.txt') == 7988899
+    assert day05.part2('input_day05.txt') == 13758663
+    assert day05.diagnostic_codes('input_day05.txt', [5, 1]) == {
+        5: 13758663, 1: 7988899}
@@ -1,7 +1,9 @@
 import pytest
+from itertools import permutations
 from typing import List, Tuple
 
 import day07
+from intcode import Computer
 
 programs: List[str] = [
     '3,15,3,16,1002,16,10,16,1,16,15,15,4,15,99,0,0',
@@ -40,3 +42,77 @@ def test_max_thrust(program, setting, thrust):
 
 def test_part1():
     assert day07.part1('input_day07.txt') == 437860
+
+
+@pytest.mark.parametrize('program,setting,thrust', test_data)
+def test_parallel_max_thrust(program, setting, thrust):
+    amps = day07.amp_series(5, program, from_file=False)
+    phases = range(len(amps))
+    assert day07.max_thrust(amps, phases, workers=2) == (thrust, setting)
+
+
+@pytest.mark.parametrize('program,phases', [
+    (programs[0], range(6)),  # thrust = 10 * signal + phase, no ties
+    ('3,11,3,12,1,11,12,13,4,13,99,0,0,0', range(6)),  # every order ties
+    (programs[2], (0, 1, 1, 2, 2, 3)),  # repeated phases tie
+])
+def test_search_thrust_matches_brute_force(monkeypatch, program, phases):
+    amps = day07.amp_series(6, program, from_file=False)
+    phases = tuple(phases)
+    runs = 0
+    run = Computer.run
+
+    def counted_run(self, *args, **kwargs):
+        nonlocal runs
+        runs += 1
+        return run(self, *args, **kwargs)
+
+    monkeypatch.setattr(Computer, 'run', counted_run)
+    expected = max((day07.thrust(amps, settings), settings)
+                   for settings in permutations(phases))
+    brute_force_runs, runs = runs, 0
+    assert day07.search_thrust(amps, phases, (), {}) == expected
+    assert brute_force_runs == 6 * 720
+    assert runs < brute_force_runs // 2
+
+
+feedback_programs: List[str] = [
+    '3,26,1001,26,-4,26,3,27,1002,27,2,27,1,27,26,27,4,27,1001,28,-1,28,' +
+    '1005,28,6,99,0,0,5',
+    '3,52,1001,52,-5,52,3,53,1,52,56,54,1007,54,5,55,1005,55,26,1001,54,' +
+    '-5,54,1105,1,12,1,53,54,53,1008,54,0,55,1001,55,1,55,2,53,55,53,4,' +
+    '53,1001,56,-1,56,1005,56,6,99,0,0,0,0,10',
+]
+
+feedback_settings: List[Tuple[int, ...]] = [
+    (9, 8, 7, 6, 5),
+    (9, 7, 8, 5, 6),
+]
+
+feedback_thrusts: List[int] = [
+    139629729,
+    18216,
+]
+
+feedback_data: List = list(zip(feedback_programs,
+                               feedback_settings,
+                               feedback_thrusts))
+
+
+@pytest.mark.parametrize('program,setting,thrust', feedback_data)
+def test_feedback_thrust(program, setting, thrust):
+    amps = day07.amp_series(5, program, from_file=False)
+    assert day07.feedback_thrust(amps, setting) == thrust
+
+
+@pytest.mark.parametrize('program,setting,thrust', feedback_data)
+def test_max_feedback_thrust(program, setting, thrust):
+    amps = day07.amp_series(5, program, from_file=False)
+    phases = range(5, 10)
+    assert day07.max_feedback_thrust(amps, phases) == (thrust, setting)
+    assert day07.max_feedback_thrust(amps, phases, workers=2) == (
+        thrust, setting)
+
+
+def test_part2():
+    assert day07.part2('input_day07.txt') == 49810599
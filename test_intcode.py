@@ -0,0 +1,348 @@
+import asyncio
+import pytest
+
+import intcode
+from intcode import Computer
+
+
+def test_parse_opvalue():
+    assert Computer.parse_opvalue(1002) == (2, 0, 1, 1)
+    assert Computer.parse_opvalue(1101) == (1, 1, 1, 1)
+    assert Computer.parse_opvalue(99) == (99,)
+    assert Computer.parse_opvalue(104) == (4, 1)
+
+
+def test_decoded_instruction_invalidated_by_write():
+    # Output 7, overwrite address 0 with a halt, then jump back to it.
+    computer = Computer.from_text('104,7,1101,99,0,0,1105,1,0')
+    assert computer.run() == [7]
+    assert computer.memory[0] == 99
+
+
+def test_direct_memory_write_redecodes():
+    computer = Computer([104, 7, 99])
+    assert computer.run() == [7]
+    computer.initialize_memory()
+    computer.memory[0] = 99
+    assert computer.run() == []
+
+
+@pytest.mark.parametrize('options', [{}, {'engine': 'compiled'},
+                                     {'peephole': True}])
+def test_direct_memory_write_into_loop(options):
+    # Count m[14] up to 3 in steps of 1, then in steps of 2 once the
+    # increment is changed, overshooting to 4.
+    program = [1001, 14, 1, 14, 1007, 14, 3, 15, 1005, 15, 0, 4, 14, 99,
+               0, 0]
+    computer = Computer(program, **options)
+    assert computer.run() == [3]
+    computer.initialize_memory()
+    computer.memory[2] = 2
+    assert computer.run() == [4]
+
+
+def test_patched_instruction_dropped_on_reset():
+    # The input is written over the opcode of the next instruction.
+    computer = Computer.from_text('3,2,0,4,99')
+    assert computer.run(with_inputs=[104]) == [4]
+    computer.initialize_memory()
+    assert computer.run(with_inputs=[4]) == [99]
+
+
+@pytest.mark.parametrize('inputs', [[1], [5]])
+def test_compiled_engine_matches_interpreter(inputs):
+    program = Computer.parse_file('input_day05.txt')
+    interpreted = Computer(program)
+    compiled = Computer(program, engine='compiled')
+    assert (compiled.run(with_inputs=inputs) ==
+            interpreted.run(with_inputs=inputs))
+    assert compiled.memory == interpreted.memory
+
+
+@pytest.mark.parametrize('engine', ['interpreter', 'compiled'])
+def test_jump_target_always_fetched(engine):
+    # The jump-if-false at 0 is not taken, but its position-mode target, at
+    # address 1005, is out of range.
+    program = [6, 14, 1005, 99, 1, 3, 3, 1101, 1, 1001, 6, 4, 14, 6, 1, 1001]
+    with pytest.raises(IndexError):
+        Computer(program, engine=engine).run()
+
+
+def test_compiled_engine_falls_back_on_self_modification():
+    # A single block that overwrites its own first instruction with a halt,
+    # then jumps back to it.
+    program = [1101, 1, 1, 12, 1101, 99, 0, 0, 1105, 1, 0, 99, 0]
+    computer = Computer(program, engine='compiled')
+    assert computer.run() == []
+    assert computer.memory[:1] + computer.memory[12:] == [99, 2]
+    assert computer.blocks[0] is None
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        Computer([99], engine='jit')
+
+
+def test_fork_continues_independently():
+    parent = Computer.from_file('input_day05.txt')
+    parent.set_inputs([5])
+    child = parent.fork()
+    assert child.memory == parent.memory
+    assert parent.run() == child.run() == [13758663]
+    parent.initialize_memory()
+    assert child.memory != parent.memory
+
+
+def test_fork_with_warm_cache():
+    parent = Computer([1101, 1, 1, 9, 1101, 2, 2, 10, 99, 0, 0])
+    parent.run()
+    parent.initialize_memory()
+    child = parent.fork()
+    assert child.run() == []
+    assert list(child.memory)[9:] == [2, 4]
+    assert parent.pointer == 0
+    assert parent.memory[9:] == [0, 0]
+
+
+def test_fork_shares_pages_until_written():
+    parent = Computer.from_text('3,0,4,0,99')
+    snapshot = parent.snapshot()
+    first = Computer(parent.original_program, snapshot=snapshot,
+                     backend='paged')
+    second = Computer(parent.original_program, snapshot=snapshot,
+                      backend='paged')
+    assert first.memory.pages[0] is second.memory.pages[0]
+    assert first.run(with_inputs=[1]) == [1]
+    assert second.run(with_inputs=[2]) == [2]
+    assert snapshot.memory[0] == 3
+
+
+def test_fork_keeps_backend_and_decoded():
+    parent = Computer(Computer.parse_file('input_day05.txt'), backend='array')
+    parent.run(with_inputs=[5])
+    parent.initialize_memory()
+    child = parent.fork()
+    assert child.backend == 'array'
+    assert type(child.memory) is type(parent.memory)
+    assert child.decoded.keys() == parent.decoded.keys()
+    assert child.run(with_inputs=[5]) == [13758663]
+
+
+@pytest.mark.parametrize('engine', ['interpreter', 'compiled'])
+def test_restore(engine):
+    computer = Computer(Computer.parse_file('input_day05.txt'), engine=engine)
+    computer.set_inputs([1])
+    snapshot = computer.snapshot()
+    first = computer.run()
+    computer.restore(snapshot)
+    assert computer.run() == first
+
+
+@pytest.mark.parametrize('engine', ['interpreter', 'compiled'])
+def test_execute_suspends_for_input(engine):
+    computer = Computer.from_text('3,11,1001,11,1,11,4,11,1105,1,0,0')
+    computer = Computer(computer.original_program, engine=engine)
+    machine = computer.execute()
+    assert next(machine) is None
+    assert machine.send(5) == 6
+    assert next(machine) is None
+    computer.inputs.append(9)
+    assert next(machine) == 10
+    assert computer.outputs == []
+
+
+def test_execute_halts():
+    computer = Computer.from_text('104,1,104,2,99')
+    assert list(computer.execute()) == [1, 2]
+
+
+def test_execute_async():
+    async def main():
+        computer = Computer.from_file('input_day05.txt')
+        inputs: asyncio.Queue = asyncio.Queue()
+        await inputs.put(5)
+        return [x async for x in computer.execute_async(inputs)]
+    assert asyncio.run(main()) == [13758663]
+
+
+@pytest.mark.parametrize('backend', ['list', 'array', 'paged', 'sparse'])
+@pytest.mark.parametrize('engine', ['interpreter', 'compiled'])
+def test_backends(backend, engine):
+    computer = Computer(Computer.parse_file('input_day05.txt'),
+                        engine=engine,
+                        backend=backend)
+    assert computer.run(with_inputs=[5]) == [13758663]
+    computer.initialize_memory()
+    assert computer.run(with_inputs=[1])[-1] == 7988899
+
+
+@pytest.mark.parametrize('engine', ['interpreter', 'compiled'])
+def test_array_backend_overflows_to_list(engine):
+    program = [1102, 2 ** 62, 4, 0, 102, 2, 0, 0, 4, 0, 99]
+    computer = Computer(program, engine=engine, backend='array')
+    assert computer.run() == [2 ** 65]
+    assert isinstance(computer.memory, list)
+    computer.initialize_memory()
+    assert list(computer.memory) == program
+
+
+def test_sparse_backend_addresses_past_program():
+    computer = Computer.from_text('1101,1,1,1000000000,4,1000000000,99')
+    with pytest.raises(IndexError):
+        computer.run()
+    computer = Computer(computer.original_program, backend='sparse')
+    assert computer.run() == [2]
+    assert len(computer.memory) == 1000000001
+
+
+@pytest.mark.parametrize('backend', ['paged', 'sparse'])
+def test_paged_backends_reject_negative_addresses(backend):
+    with pytest.raises(IndexError):
+        Computer([4, -1, 99], backend=backend).run()
+    with pytest.raises(IndexError):
+        Computer([1101, 1, 1, -5, 99], backend=backend).run()
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        Computer([99], backend='disk')
+
+
+def test_profile():
+    computer = Computer(Computer.parse_text('1101,2,3,0,4,0,99'), profile=True)
+    assert computer.run() == [5]
+    profile = computer.profile.as_dict()
+    assert profile['instructions'] == 3
+    assert profile['opcodes'] == {'add': 1, 'out': 1, 'halt': 1}
+    assert profile['addresses'] == {0: 1, 4: 1, 6: 1}
+    assert profile['runs'] == 1
+    assert computer.profile.folded() == [
+        'intcode;add;0 1', 'intcode;out;4 1', 'intcode;halt;6 1']
+
+
+def test_profile_counts_loops():
+    computer = Computer(Computer.parse_file('input_day05.txt'), profile=True)
+    computer.run(with_inputs=[5])
+    opcodes = computer.profile.opcodes()
+    assert opcodes[3] == opcodes[4] == opcodes[99] == 1
+    assert computer.profile.instructions == sum(
+        computer.profile.addresses().values())
+
+
+def test_profile_needs_interpreter():
+    with pytest.raises(ValueError):
+        Computer([99], engine='compiled', profile=True)
+
+
+@pytest.mark.parametrize('engine', ['interpreter', 'compiled'])
+def test_run_slice(engine):
+    computer = Computer(Computer.parse_file('input_day05.txt'), engine=engine)
+    assert computer.run_slice(100) == ('blocked', 0)
+    computer.set_inputs([5])
+    status, executed = computer.run_slice(3)
+    assert status == 'ready' and executed >= 3
+    while status == 'ready':
+        status, _ = computer.run_slice(3)
+    assert status == 'halted'
+    assert computer.outputs == [13758663]
+
+
+@pytest.mark.parametrize('backend', ['list', 'array'])
+@pytest.mark.parametrize('engine', ['interpreter', 'compiled'])
+def test_reset_restores_dirty_pages(backend, engine):
+    program = Computer.parse_file('input_day05.txt')
+    computer = Computer(program, engine=engine, backend=backend)
+    memory = computer.memory
+    for inputs in ([1], [5], [5]):
+        computer.reset_written()
+        computer.run(with_inputs=inputs)
+        assert computer.dirty
+    computer.reset_written()
+    assert computer.memory is memory  # restored in place
+    assert list(computer.memory) == program
+    assert not computer.dirty
+
+
+@pytest.mark.parametrize('backend', ['list', 'array'])
+def test_reset_restores_direct_assignment(backend):
+    computer = Computer([1, 0, 0, 0, 99], backend=backend)
+    computer.memory[0] = 2
+    computer.initialize_memory()
+    assert list(computer.memory) == [1, 0, 0, 0, 99]
+
+
+def test_reset_copies_replaced_memory():
+    computer = Computer.from_text('1101,1,1,5,99,0')
+    computer.memory = [1101, 2, 2, 5, 99, 0]
+    computer.run()
+    computer.initialize_memory()
+    assert computer.memory == [1101, 1, 1, 5, 99, 0]
+
+
+# Count m[30] up to 50 and output 7 before reading an input, then output
+# the count plus the input.
+setup = [1001, 30, 1, 30, 1007, 30, 50, 31, 1005, 31, 0, 104, 7,
+         3, 32, 1, 30, 32, 33, 4, 33, 99] + [0] * 12
+
+
+# The same, without the output.
+quiet_setup = [1001, 30, 1, 30, 1007, 30, 50, 31, 1005, 31, 0,
+               3, 32, 1, 30, 32, 33, 4, 33, 99] + [0] * 14
+
+
+@pytest.mark.parametrize('engine', ['interpreter', 'compiled'])
+def test_checkpoint_skips_setup(engine):
+    point = Computer.input_point(quiet_setup)
+    assert point.pointer == 11 and point.outputs == ()
+    assert Computer.input_point(list(quiet_setup)) is point  # cached
+    computer = Computer(quiet_setup, engine=engine, checkpoint=True)
+    assert computer.pointer == 11 and computer.memory[30] == 50
+    for value in (1, 2, 3):
+        computer.initialize_memory()
+        assert computer.run_slice(5) == ('blocked', 0)
+        assert computer.run(with_inputs=[value]) == [50 + value]
+    child = computer.fork()
+    child.initialize_memory()
+    assert child.run(with_inputs=[4]) == [54]
+
+
+def test_checkpoint_skipped_after_output():
+    assert Computer.input_point(setup).outputs == (7,)
+    computer = Computer(setup, checkpoint=True)
+    assert computer.pointer == 0
+    assert computer.run(with_inputs=[1], stop_at_first_output=True) == [7]
+    computer.initialize_memory()
+    computer.set_inputs([1])
+    assert next(computer.execute()) == 7
+
+
+def test_checkpoint_without_input_point():
+    spin = [1105, 1, 0]
+    assert Computer.input_point(spin, budget=100) is None
+    assert Computer(spin, checkpoint=True).pointer == 0
+    halts = Computer.parse_text('1101,1,2,5,99,0')
+    computer = Computer(halts, checkpoint=True)
+    assert computer.pointer == 4 and computer.memory[5] == 3
+    assert computer.run() == []
+
+
+def test_checkpoint_of_failing_program(monkeypatch):
+    monkeypatch.setattr(Computer, '_input_points', {})
+    for program in ([1101, 1, 1, 5, 55, 0], [1, 100, 0, 0, 99]):
+        computer = Computer(program, checkpoint=True)
+        assert computer.pointer == 0
+        key = (tuple(program), intcode.PREFIX_BUDGET)
+        assert Computer._input_points[key] is None  # cached
+        with pytest.raises((KeyError, IndexError)):
+            computer.run()
+
+
+def test_input_points_cached_by_budget(monkeypatch):
+    monkeypatch.setattr(intcode, 'INPUT_POINTS', 3)
+    monkeypatch.setattr(Computer, '_input_points', {})
+    assert Computer.input_point(quiet_setup, budget=100) is None
+    assert Computer.input_point(quiet_setup).pointer == 11
+    for value in range(3):
+        Computer.input_point([3, 0, 99, value])
+    assert len(Computer._input_points) == 3
+    assert (tuple(quiet_setup), 100) not in Computer._input_points
@@ -0,0 +1,49 @@
+from intcode import Computer
+import intcode_analysis
+
+# Count m[20] up to 5, then output it.
+loop = Computer.parse_text('1101,0,0,20,1001,20,1,20,1007,20,5,21,' +
+                           '1005,21,4,4,20,99,0,0,0,0')
+
+
+def test_decode():
+    instruction = intcode_analysis.decode(loop, 4)
+    assert instruction == (4, 1, (0, 1, 1), (20, 1, 20))
+    assert instruction.size == 4
+    assert instruction.destination == 20
+    assert str(instruction) == '     4: add  [20] 1 -> [20]'
+
+
+def test_disassemble():
+    addresses = [x.address for x in intcode_analysis.disassemble(loop)]
+    assert addresses[:6] == [0, 4, 8, 12, 15, 17]
+
+
+def test_analyze_loop():
+    analysis = intcode_analysis.analyze(loop)
+    assert list(analysis.blocks) == [0, 4, 15]
+    assert analysis.blocks[0].successors == (4,)
+    assert analysis.blocks[4].successors == (4, 15)
+    assert analysis.blocks[15].successors == ()
+    assert analysis.loops == [(4, 4)]
+    assert not analysis.self_modifying
+    assert analysis.static
+    assert analysis.dynamic_jumps == []
+
+
+def test_analyze_self_modifying():
+    # The add at 2 patches the word at 6 into a jump.
+    analysis = intcode_analysis.analyze(
+        Computer.parse_file('input_day05.txt'))
+    assert analysis.code_writes == {2: 6}
+    assert analysis.blocks[0].dynamic
+    assert not analysis.static
+
+
+def test_analyze_dynamic_jump():
+    # The input at 0 overwrites the target of the jump at 6.
+    analysis = intcode_analysis.analyze(
+        Computer.parse_file('input_day07.txt'))
+    assert analysis.dynamic_jumps == [6]
+    assert analysis.code_writes == {0: 8, 2: 8}
+    assert '-> ?' in analysis.format()
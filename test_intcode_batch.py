@@ -0,0 +1,69 @@
+import pytest
+from typing import List
+
+np = pytest.importorskip('numpy')
+
+import day02  # noqa: E402
+import day07  # noqa: E402
+from intcode import Computer  # noqa: E402
+import intcode_batch  # noqa: E402
+
+# (program, phase setting, thrust), the examples from day 7
+amp_data: List = [
+    ('3,15,3,16,1002,16,10,16,1,16,15,15,4,15,99,0,0',
+     (4, 3, 2, 1, 0), 43210),
+    ('3,23,3,24,1002,24,10,24,1002,23,-1,23,101,5,23,23,1,24,23,23,4,23,' +
+     '99,0,0', (0, 1, 2, 3, 4), 54321),
+    ('3,31,3,32,1002,32,10,32,1001,31,-2,31,1007,31,0,33,1002,33,7,33,1,' +
+     '33,31,31,1,32,31,31,4,31,99,0,0,0', (1, 0, 4, 3, 2), 65210),
+]
+
+# Counts to 50 and outputs 7 before reading its first input.
+setup = [1001, 30, 1, 30, 1007, 30, 50, 31, 1005, 31, 0, 104, 7,
+         3, 32, 1, 30, 32, 33, 4, 33, 99] + [0] * 12
+
+
+def test_run_batch_matches_computer():
+    program = Computer.parse_file('input_day05.txt')
+    inputs = [[1], [5]] * 4 + [[8]]
+    expected = [Computer(program).run(with_inputs=list(x)) for x in inputs]
+    assert intcode_batch.run_batch(program, inputs) == expected
+
+
+def test_diverging_jumps():
+    program = Computer.parse_file('input_day07.txt')
+    inputs = [[phase, signal] for phase in range(5) for signal in range(20)]
+    expected = [Computer(program).run(with_inputs=list(x)) for x in inputs]
+    assert intcode_batch.run_batch(program, inputs) == expected
+
+
+def test_peel_on_overflow():
+    program = [3, 13, 1002, 13, 2 ** 61, 13, 4, 13, 99] + [0] * 5
+    batch = intcode_batch.BatchComputer(program, 4, min_group=1)
+    batch.set_inputs([[1], [4], [8], [0]])
+    assert batch.run() == [[2 ** 61], [2 ** 63], [2 ** 64], [0]]
+    assert set(batch.peeled) == {1, 2}
+    assert batch.values_at(13) == [2 ** 61, 2 ** 63, 2 ** 64, 0]
+
+
+def test_missing_input():
+    batch = intcode_batch.BatchComputer([3, 0, 99], 4)
+    with pytest.raises(EOFError):
+        batch.run()
+
+
+def test_batch_determine_inputs():
+    program = day02.parse_input('input_day02.txt')
+    assert day02.batch_determine_inputs(program, 19690720) == (77, 49)
+    assert day02.batch_determine_inputs(program, 3516593) == (12, 2)
+
+
+@pytest.mark.parametrize('program,setting,thrust', amp_data)
+def test_batch_max_thrust(program, setting, thrust):
+    amps = day07.amp_series(5, program, from_file=False)
+    assert day07.batch_max_thrust(amps, range(5)) == (thrust, setting)
+
+
+def test_run_batch_starts_at_input_point():
+    outputs = intcode_batch.run_batch(setup, [[1], [2]] * 3)
+    assert outputs == [[7, 51], [7, 52]] * 3
@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+from intcode import Computer
+import intcode_format
+
+
+def test_round_trip():
+    program = [1, -2, 2 ** 63 - 1, -2 ** 63, 2 ** 70, -3 ** 50, 99]
+    data = intcode_format.dumps(program)
+    assert data.startswith(intcode_format.MAGIC)
+    assert intcode_format.loads(data) == program
+    assert intcode_format.loads(intcode_format.dumps([])) == []
+
+
+def test_bad_data():
+    with pytest.raises(ValueError):
+        intcode_format.loads(b'1,2,3,99')
+    with pytest.raises(ValueError):
+        intcode_format.loads(intcode_format.dumps([1, 2, 3])[:-1])
+
+
+def test_convert_and_mmap_load(tmp_path):
+    binary = str(tmp_path / 'day05.icb')
+    intcode_format.convert('input_day05.txt', binary)
+    assert intcode_format.is_binary(binary)
+    assert not intcode_format.is_binary('input_day05.txt')
+    program = intcode_format.load_binary(binary)
+    assert program == intcode_format.load_text('input_day05.txt')
+    assert Computer.from_file(binary).run(with_inputs=[5]) == [13758663]
+
+
+def test_cache(tmp_path):
+    path = tmp_path / 'program.txt'
+    path.write_text('1,0,0,0,99')
+    first = Computer.parse_file(str(path))
+    first[0] = 2  # callers get their own copy
+    assert Computer.parse_file(str(path)) == [1, 0, 0, 0, 99]
+    assert str(path) in intcode_format.cache
+
+    path.write_text('2,0,0,0,99')
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert Computer.parse_file(str(path)) == [2, 0, 0, 0, 99]
+
+
+def test_cache_skips_parsing(tmp_path, monkeypatch):
+    path = str(tmp_path / 'program.txt')
+    with open(path, 'w') as f:
+        f.write('104,5,99')
+    Computer.parse_file(path)
+
+    def fail(filename):
+        raise AssertionError('parsed again')
+
+    monkeypatch.setattr(intcode_format, 'load_text', fail)
+    assert [amp.run() for amp in
+            [Computer.from_file(path) for _ in range(5)]] == [[5]] * 5
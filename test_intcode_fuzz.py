@@ -0,0 +1,71 @@
+import random
+
+import pytest
+
+from intcode import Computer
+import intcode_fuzz
+from intcode_fuzz import ENGINES, Mismatch
+
+
+def computers():
+    return [name for name in ENGINES
+            if name not in ('day02', 'day05', 'batch')]
+
+
+def test_shared():
+    opcodes, modes = intcode_fuzz.shared(['day02', 'interpreter'])
+    assert opcodes == {1, 2, 99}
+    assert not modes
+    opcodes, modes = intcode_fuzz.shared(computers())
+    assert opcodes == set(Computer.num_params)
+    assert modes
+
+
+@pytest.mark.parametrize('iterations', [1, 5])
+def test_random_program_halts(iterations):
+    rng = random.Random(1)
+    for _ in range(50):
+        program, inputs = intcode_fuzz.random_program(rng,
+                                                      iterations=iterations)
+        computer = Computer(program)
+        computer.set_inputs(inputs)
+        assert computer.run_slice(100000)[0] == 'halted'
+
+
+def test_random_program_without_modes():
+    rng = random.Random(2)
+    program, inputs = intcode_fuzz.random_program(rng, (1, 2, 99), False)
+    assert not inputs
+    assert set(program[:4 * 20:4]) <= {1, 2}
+    with pytest.raises(ValueError):
+        intcode_fuzz.random_program(rng, (1, 2, 99), False, iterations=2)
+
+
+def test_fuzz_all_engines():
+    assert intcode_fuzz.fuzz(30, seed=3) == 30
+
+
+def test_fuzz_computers_in_loops():
+    assert intcode_fuzz.fuzz(30, seed=4, names=[*computers(), 'day05'],
+                             iterations=5) == 30
+
+
+def test_mismatch():
+    def off_by_one(program, inputs):
+        memory, outputs = ENGINES['interpreter'].run(program, inputs)
+        return memory, [x + 1 for x in outputs]
+
+    intcode_fuzz.register('broken', off_by_one)
+    try:
+        with pytest.raises(Mismatch) as error:
+            intcode_fuzz.fuzz(30, seed=5, names=['interpreter', 'broken'])
+        assert 'interpreter vs broken' in str(error.value)
+        assert set(error.value.results) == {'interpreter', 'broken'}
+    finally:
+        del ENGINES['broken']
+
+
+def test_report():
+    lines = intcode_fuzz.report(['day02', 'interpreter'], count=5)
+    assert len(lines) == 2
+    assert all('M instructions/s' in line for line in lines)
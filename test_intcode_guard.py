@@ -0,0 +1,100 @@
+import pytest
+
+from intcode import Computer
+from intcode_guard import Limits, LoopError
+
+day05 = Computer.parse_file('input_day05.txt')
+spin = [1101, 0, 0, 9, 1105, 1, 0, 99, 99, 0]  # sets m[9] = 0 forever
+# Count m[20] down from 3 to 0, output it, and start again from 3.
+counter = [1001, 20, -1, 20, 1005, 20, 0, 4, 20, 1101, 3, 0, 20,
+           1105, 1, 0, 0, 0, 0, 0, 3]
+# Count m[12] up without end.
+runaway = [1001, 12, 1, 12, 1105, 1, 0, 99, 0, 0, 0, 0, 0]
+
+
+def test_cycle_found():
+    computer = Computer(spin, limits=Limits(cycles=True))
+    with pytest.raises(LoopError) as error:
+        computer.run()
+    assert error.value.reason == 'cycle'
+    assert error.value.period % 2 == 0
+    assert error.value.loop == (0, 6)
+    assert f'repeats every {error.value.period} steps' in str(error.value)
+
+
+def test_cycle_with_outputs():
+    computer = Computer(counter, limits=Limits(cycles=True))
+    with pytest.raises(LoopError) as error:
+        computer.run()
+    assert error.value.reason == 'cycle'
+    assert error.value.period % (3 * 2 + 3) == 0
+    assert error.value.loop == (0, 15)
+    assert computer.outputs[:2] == [0, 0]
+
+
+def test_growing_state_is_not_a_cycle():
+    computer = Computer(runaway, limits=Limits(max_steps=10000, cycles=True))
+    with pytest.raises(LoopError) as error:
+        computer.run()
+    assert error.value.reason == 'steps'
+    assert 10000 <= error.value.steps < 10000 + 2 * 16
+    assert error.value.loop == (0, 6)
+    assert computer.memory[12] >= 5000
+
+
+def test_time_limit():
+    computer = Computer(runaway, limits=Limits(max_seconds=0.05))
+    with pytest.raises(LoopError) as error:
+        computer.run()
+    assert error.value.reason == 'time'
+    assert error.value.elapsed >= 0.05
+
+
+def test_input_resets_detection():
+    # Read an input into m[9] forever: each state depends on new input.
+    program = [3, 9, 1105, 1, 0, 99, 99, 99, 99, 0]
+    computer = Computer(program, limits=Limits(max_steps=200, cycles=True))
+    computer.set_inputs([1] * 1000)
+    with pytest.raises(LoopError) as error:
+        computer.run()
+    assert error.value.reason == 'steps'
+
+
+@pytest.mark.parametrize('inputs', [[1], [5]])
+def test_guarded_run_matches(inputs):
+    limits = Limits(max_steps=10 ** 6, max_seconds=10, cycles=True)
+    guarded = Computer(day05, limits=limits)
+    assert guarded.run(with_inputs=inputs) == Computer(day05).run(
+        with_inputs=inputs)
+
+
+def test_limits_need_interpreter():
+    with pytest.raises(ValueError):
+        Computer([99], engine='compiled', limits=Limits(max_steps=10))
+
+
+def test_execute_is_guarded():
+    computer = Computer([1105, 1, 0], limits=Limits(max_steps=100))
+    with pytest.raises(LoopError) as error:
+        next(computer.execute())
+    assert error.value.reason == 'steps'
+
+
+def test_execute_guards_between_outputs():
+    computer = Computer(counter, limits=Limits(cycles=True))
+    machine = computer.execute()
+    assert [next(machine), next(machine)] == [0, 0]
+    with pytest.raises(LoopError) as error:
+        list(machine)
+    assert error.value.reason == 'cycle'
+
+
+def test_run_slice_guards_the_whole_run():
+    computer = Computer(runaway, limits=Limits(max_steps=1000))
+    with pytest.raises(LoopError) as error:
+        while True:
+            computer.run_slice(100)
+    assert error.value.reason == 'steps'
+    assert 1000 <= error.value.steps < 1000 + 2 * 16
+    computer.initialize_memory()
+    assert computer.run_slice(500) == ('ready', 500)
@@ -0,0 +1,99 @@
+import asyncio
+import io
+import threading
+
+import pytest
+
+from intcode import Computer
+import intcode_io
+
+echo = Computer.parse_text('3,9,4,9,1105,1,0,99,99,0')  # echo inputs forever
+
+
+def test_deque_channel():
+    inputs = intcode_io.DequeChannel([1, 2])
+    outputs = intcode_io.DequeChannel()
+    computer = Computer(echo, input_channel=inputs, output_channel=outputs)
+    with pytest.raises(EOFError):
+        computer.run()
+    assert list(outputs.values) == [1, 2]
+    assert computer.outputs == []
+
+
+def test_console_channel(monkeypatch):
+    answers = iter(['x', '7'])
+    monkeypatch.setattr('builtins.input', lambda prompt: next(answers))
+    computer = Computer.from_text('3,0,4,0,99')
+    assert computer.run() == [7]
+
+
+def test_queue_channel_pipeline():
+    # Two day07 amps in separate threads, joined by a bounded queue.
+    program = Computer.parse_text('3,15,3,16,1002,16,10,16,1,16,15,15,' +
+                                  '4,15,99,0,0')
+    link = intcode_io.QueueChannel(maxsize=1, timeout=5)
+    first = Computer(program, output_channel=link)
+    second = Computer(program, input_channel=link)
+    thread = threading.Thread(target=first.run, kwargs={'with_inputs': [4, 0]})
+    thread.start()
+    assert second.run(with_inputs=[3]) == [43]
+    thread.join()
+
+
+def test_pipe_channel():
+    reader, writer = intcode_io.PipeChannel.pipe()
+    producer = Computer.from_text('104,5,104,-6,99')
+    producer.output_channel = writer
+    producer.run()
+    writer.close()
+    computer = Computer(echo, input_channel=reader)
+    with pytest.raises(EOFError):
+        computer.run()
+    assert computer.outputs == [5, -6]
+    reader.close()
+
+
+def test_callback_channel():
+    sent = []
+    channel = intcode_io.CallbackChannel(get=lambda: 41, put=sent.append)
+    computer = Computer(Computer.parse_text('3,0,101,1,0,0,4,0,99'),
+                        input_channel=channel,
+                        output_channel=channel)
+    computer.run()
+    assert sent == [42]
+
+
+def test_async_queue_channel():
+    async def main():
+        loop = asyncio.get_running_loop()
+        inputs: asyncio.Queue = asyncio.Queue()
+        outputs: asyncio.Queue = asyncio.Queue()
+        computer = Computer(Computer.parse_text('3,0,4,0,99'),
+                            input_channel=intcode_io.AsyncQueueChannel(
+                                inputs, loop),
+                            output_channel=intcode_io.AsyncQueueChannel(
+                                outputs, loop))
+        running = loop.run_in_executor(None, computer.run)
+        await inputs.put(9)
+        result = await outputs.get()
+        await running
+        return result
+    assert asyncio.run(main()) == 9
+
+
+def test_poll():
+    channel = intcode_io.DequeChannel([1])
+    assert channel.poll() == 1
+    assert channel.poll() is None
+    channel = intcode_io.QueueChannel()
+    assert channel.poll() is None
+    channel.put(2)
+    assert channel.poll() == 2
+    assert intcode_io.CallbackChannel(get=lambda: 3).poll() is None
+
+
+def test_one_way_channels():
+    with pytest.raises(io.UnsupportedOperation):
+        intcode_io.CallbackChannel(get=lambda: 1).put(1)
+    with pytest.raises(io.UnsupportedOperation):
+        intcode_io.CallbackChannel(put=lambda value: None).get()
@@ -0,0 +1,111 @@
+import pytest
+
+from intcode import Computer
+from intcode_peephole import FUSED, fuse
+
+# Count m[20] up to 5 in a loop, then output it.
+counter = [1001, 20, 1, 20, 1007, 20, 5, 21, 1005, 21, 0, 4, 20, 99,
+           0, 0, 0, 0, 0, 0, 0, 0]
+
+
+def test_count_loop():
+    computer = Computer(counter, peephole=True)
+    assert computer.run() == [5]
+    fused = computer.superinstructions[0]
+    assert fused.pattern == 'count-loop'
+    assert fused.end == 11
+    assert 'm[21]' not in fused.source  # the compare result is reused
+    assert computer.decoded[0][0] == FUSED
+
+
+def test_patterns():
+    program = Computer.parse_text('1008,9,0,10,1006,10,0,99,99,0,0')
+    assert fuse(Computer(program), 0).pattern == 'compare-jump'
+    program = Computer.parse_text('1002,9,3,10,1,10,9,9,99,0,0')
+    assert fuse(Computer(program), 0).pattern == 'multiply-add'
+    program = Computer.parse_text('3,0,4,0,99')
+    assert fuse(Computer(program), 0) is None
+
+
+@pytest.mark.parametrize('program', [
+    [1008, 9, 0, 10, 6, 10, 1000, 99, 99, 0, 0],  # compare-jump
+    [1101, 1, 1, 9, 105, 0, 1000, 99, 99, 0],  # add-jump, never taken
+])
+def test_jump_target_always_fetched(program):
+    # The jump is not taken, but its position-mode target is out of range.
+    assert fuse(Computer(program), 0) is not None
+    with pytest.raises(IndexError):
+        Computer(program, peephole=True).run()
+
+
+def test_no_fusion_of_code_written_by_itself():
+    # The multiply stores over the opcode of the add.
+    program = Computer.parse_text('1002,9,1,4,1,9,9,9,99,0')
+    assert fuse(Computer(program), 0) is None
+
+
+@pytest.mark.parametrize('filename, inputs', [('input_day05.txt', [1]),
+                                              ('input_day05.txt', [5]),
+                                              ('input_day07.txt', [4, 0])])
+def test_matches_interpreter(filename, inputs):
+    program = Computer.parse_file(filename)
+    plain = Computer(program)
+    fused = Computer(program, peephole=True)
+    for _ in range(2):  # the second run reuses the superinstructions
+        plain.initialize_memory()
+        fused.initialize_memory()
+        assert (fused.run(with_inputs=list(inputs)) ==
+                plain.run(with_inputs=list(inputs)))
+        assert fused.memory == plain.memory
+    assert any(fused.superinstructions.values())
+
+
+def test_write_into_superinstruction_invalidates_it():
+    # Compare and jump to 11 the first time. There, the jump-if-true at 4 is
+    # rewritten as a jump-if-false before going back, so the second pass
+    # falls through to the output.
+    program = [1008, 30, 0, 31, 1005, 31, 11, 104, 7, 99, 0,
+               1101, 1006, 0, 4, 1105, 1, 0] + [0] * 14
+    computer = Computer(program, peephole=True)
+    assert computer.run() == [7]
+    assert computer.memory[4] == 1006
+
+
+def test_write_into_overlapping_superinstructions():
+    # The count loop at 0 and the compare-jump at 4 both cover address 6.
+    # Each runs once, then the code at 37 writes 10 to address 6, so the
+    # loop has to count on to 10.
+    program = [0] * 64
+    program[0:4] = [1001, 60, 1, 60]
+    program[4:8] = [1007, 60, 5, 61]
+    program[8:11] = [1005, 61, 0]
+    program[11:13] = [4, 60]
+    program[13:16] = [1005, 62, 30]
+    program[16:20] = [1101, 1, 0, 62]
+    program[20:23] = [1105, 1, 4]
+    program[30:33] = [1005, 63, 50]
+    program[33:37] = [1101, 1, 0, 63]
+    program[37:41] = [1101, 10, 0, 6]
+    program[41:44] = [1105, 1, 0]
+    program[50] = 99
+    assert Computer(program).run() == [5, 5, 10]
+    assert Computer(program, peephole=True).run() == [5, 5, 10]
+
+
+def test_fork_fuses_its_own():
+    parent = Computer(counter, peephole=True)
+    parent.run()
+    child = parent.fork()
+    assert child.peephole
+    assert all(instruction[0] != FUSED
+               for instruction in child.decoded.values())
+    child.initialize_memory()
+    assert child.run() == [5]
+    assert parent.outputs == [5]
+
+
+def test_peephole_needs_interpreter():
+    with pytest.raises(ValueError):
+        Computer([99], engine='compiled', peephole=True)
+    with pytest.raises(ValueError):
+        Computer([99], profile=True, peephole=True)
@@ -0,0 +1,31 @@
+from intcode import Computer
+from intcode_pool import ComputerPool
+
+day07 = Computer.parse_file('input_day07.txt')
+
+
+def test_reuses_computers():
+    pool = ComputerPool(engine='compiled')
+    with pool.computer(day07) as amp:
+        assert amp.engine == 'compiled'
+        assert amp.run(with_inputs=[4, 0]) == [90]
+    assert len(pool) == 1
+    with pool.computer(day07) as again:
+        assert again is amp
+        assert again.memory == day07 and again.pointer == 0
+        assert again.outputs == [] and not again.inputs
+        assert again.run(with_inputs=[4, 0]) == [90]
+    assert (pool.created, pool.reused) == (1, 1)
+
+
+def test_separate_programs():
+    pool = ComputerPool()
+    other = Computer.parse_text('104,1,99')
+    first = pool.acquire(day07)
+    second = pool.acquire(day07)
+    assert first is not second
+    pool.release(first)
+    pool.release(second)
+    assert pool.acquire(other).run() == [1]
+    assert pool.acquire(day07) in (first, second)
+    assert pool.created == 3
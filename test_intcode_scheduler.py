@@ -0,0 +1,109 @@
+import pytest
+
+from intcode import Computer
+from day07 import thrust as day07_thrust
+from intcode_io import DequeChannel
+from intcode_scheduler import Scheduler
+
+day05 = Computer.parse_file('input_day05.txt')
+day07 = Computer.parse_file('input_day07.txt')
+spin = Computer.parse_text('1105,1,0')  # jumps to itself forever
+
+
+@pytest.mark.parametrize('engine', ['interpreter', 'compiled'])
+def test_fleet(engine):
+    scheduler = Scheduler(slice_size=50)
+    tasks = [scheduler.add(Computer(day05, engine=engine))
+             for _ in range(20)]
+    for task in tasks:
+        scheduler.send(task, 5)
+    metrics = scheduler.run()
+    assert [task.computer.outputs for task in tasks] == [[13758663]] * 20
+    assert metrics.halted == 20
+    assert metrics.ready == metrics.blocked == 0
+    assert metrics.instructions == sum(t.instructions for t in tasks)
+    assert metrics.slices > 20
+
+
+def test_blocked_tasks_are_parked():
+    scheduler = Scheduler()
+    task = scheduler.add(Computer(day05))
+    metrics = scheduler.run()
+    assert task.status == 'blocked'
+    assert metrics.blocked == 1 and metrics.slices == 1
+    scheduler.send(task, 1)
+    scheduler.run()
+    assert task.status == 'halted'
+    assert task.computer.outputs[-1] == 7988899
+
+
+def test_inputs_polled_from_channel():
+    computer = Computer(Computer.parse_text('3,0,4,0,3,0,4,0,99'),
+                        input_channel=DequeChannel([7]))
+    scheduler = Scheduler()
+    task = scheduler.add(computer)
+    scheduler.run()
+    assert task.status == 'blocked'
+    assert computer.outputs == [7]
+    computer.input_channel.put(8)
+    scheduler.send(task, 9)  # queued inputs come first
+    scheduler.run()
+    assert task.status == 'halted'
+    assert computer.outputs == [7, 9]
+
+
+def test_runaway_does_not_starve():
+    scheduler = Scheduler(slice_size=100)
+    runaway = scheduler.add(Computer(spin), name='spin')
+    worker = scheduler.add(Computer(day05))
+    scheduler.send(worker, 5)
+    metrics = scheduler.run(max_slices=20)
+    assert worker.status == 'halted'
+    assert runaway.status == 'ready'
+    assert metrics.ready == 1 and metrics.halted == 1
+    assert 'spin' in repr(runaway)
+
+
+def test_priority_share():
+    scheduler = Scheduler(slice_size=10)
+    low = scheduler.add(Computer(spin), priority=1)
+    high = scheduler.add(Computer(spin), priority=3)
+    scheduler.run(max_slices=400)
+    assert high.instructions == pytest.approx(3 * low.instructions, rel=0.05)
+    with pytest.raises(ValueError):
+        scheduler.add(Computer(spin), priority=0)
+
+
+def test_late_arrival_is_not_owed_time():
+    scheduler = Scheduler(slice_size=10)
+    old = scheduler.add(Computer(spin))
+    scheduler.run(max_slices=50)
+    new = scheduler.add(Computer(spin))
+    scheduler.run(max_slices=20)
+    assert old.slices == 60
+    assert new.slices == 10
+
+
+def test_connected_amps():
+    scheduler = Scheduler(slice_size=7)
+    amps = [scheduler.add(Computer(day07)) for _ in range(5)]
+    for source, target in zip(amps, amps[1:]):
+        scheduler.connect(source, target)
+    for amp, phase in zip(amps, (0, 1, 2, 3, 4)):
+        scheduler.send(amp, phase)
+    scheduler.send(amps[0], 0)
+    metrics = scheduler.run()
+    assert metrics.halted == 5
+    expected = day07_thrust([Computer(day07) for _ in range(5)],
+                            (0, 1, 2, 3, 4))
+    assert amps[-1].computer.outputs == [expected]
+    assert all(amp.computer.outputs == [] for amp in amps[:-1])
+
+
+def test_metrics_rate():
+    scheduler = Scheduler()
+    scheduler.add(Computer(spin))
+    metrics = scheduler.run(max_slices=5)
+    assert metrics.slices == 5
+    assert metrics.instructions == 5000
+    assert metrics.instructions_per_second > 0
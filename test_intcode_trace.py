@@ -0,0 +1,91 @@
+import pytest
+
+from intcode import Computer
+import intcode_trace
+from intcode_trace import Replayer, get, put, record
+
+day05 = Computer.parse_file('input_day05.txt')
+
+
+def test_varints():
+    buffer = bytearray()
+    values = [0, 1, -1, 63, -64, 64, 2 ** 70, -2 ** 70]
+    for value in values:
+        put(buffer, value)
+    assert len(buffer) < 8 * len(values)
+    offset = 0
+    for value in values:
+        decoded, offset = get(buffer, offset)
+        assert decoded == value
+    assert offset == len(buffer)
+
+
+def recorded(tmp_path, checkpoint_every=10):
+    path = str(tmp_path / 'day05.trace')
+    computer = Computer(day05)
+    computer.set_inputs([5])
+    assert record(computer, path, checkpoint_every) == [13758663]
+    return path, computer
+
+
+def test_record_and_iterate(tmp_path):
+    path, computer = recorded(tmp_path)
+    replayer = Replayer(path)
+    steps = list(replayer)
+    assert len(replayer) == len(steps) > 10
+    assert [step.index for step in steps] == list(range(len(steps)))
+    assert steps[0].pointer == 0
+    assert steps[-1].opvalue == 99
+    inputs = [step for step in steps if step.opvalue % 100 == 3]
+    assert len(inputs) == 1 and inputs[0].write[1] == 5
+    outputs = [step.operands[0] for step in steps if step.opvalue % 100 == 4]
+    assert outputs == [13758663]
+    assert len(replayer.checkpoints) == (len(steps) + 9) // 10
+    assert replayer[37] == steps[37]
+
+
+def test_state_matches_execution(tmp_path):
+    path, finished = recorded(tmp_path)
+    replayer = Replayer(path)
+    computer = Computer(day05)
+    computer.set_inputs([5])
+    for step in range(len(replayer)):
+        pointer, memory = replayer.state(step)
+        assert pointer == computer.pointer
+        assert memory == computer.memory
+        computer.run_slice(1)
+    pointer, memory = replayer.state(len(replayer))
+    assert memory == finished.memory and pointer == finished.pointer
+    with pytest.raises(IndexError):
+        replayer.state(len(replayer) + 1)
+
+
+def test_computer_resumes_run(tmp_path):
+    path, _ = recorded(tmp_path, checkpoint_every=7)
+    replayer = Replayer(path)
+    assert replayer.computer(0).run() == [13758663]
+    middle = replayer.computer(len(replayer) // 2, backend='paged')
+    assert middle.run() == [13758663]
+
+
+def test_buffered_writes(tmp_path, monkeypatch):
+    path = str(tmp_path / 'small.trace')
+    writes = []
+    writer = intcode_trace.TraceWriter(path, buffer_size=64)
+    real_write = writer.file.write
+    monkeypatch.setattr(writer.file, 'write',
+                        lambda data: writes.append(len(data)) or
+                        real_write(data))
+    writer.checkpoint(0, [99])
+    for pointer in range(40):
+        writer.step(pointer, 1105, (1, pointer + 1), None)
+    writer.close()
+    assert 1 < len(writes) < 40
+    assert len(Replayer(path)) == 40
+
+
+def test_not_a_trace(tmp_path):
+    path = tmp_path / 'bad.trace'
+    path.write_bytes(b'1,2,3,99')
+    with pytest.raises(ValueError):
+        Replayer(str(path))